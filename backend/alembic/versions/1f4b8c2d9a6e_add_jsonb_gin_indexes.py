@@ -0,0 +1,47 @@
+"""Add GIN indexes on JSONB columns
+
+Revision ID: 1f4b8c2d9a6e
+Revises: 87ca75276ce2
+Create Date: 2026-10-14 10:12:04.318220
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1f4b8c2d9a6e'
+down_revision: Union[str, Sequence[str], None] = '87ca75276ce2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (index name, table, column) - jsonb_path_ops only supports containment (@>)
+# queries, but yields much smaller and faster indexes than the default jsonb_ops.
+GIN_INDEXES = [
+    ('ix_facts_metadata_gin', 'facts', 'metadata'),
+    ('ix_episodic_memories_emotions_gin', 'episodic_memories', 'emotions'),
+    ('ix_episodic_memories_topics_gin', 'episodic_memories', 'topics'),
+    ('ix_users_preferences_gin', 'users', 'preferences'),
+    ('ix_users_traits_gin', 'users', 'traits'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, table, column in GIN_INDEXES:
+        op.create_index(
+            name,
+            table,
+            [column],
+            postgresql_using='gin',
+            postgresql_ops={column: 'jsonb_path_ops'},
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, _ in reversed(GIN_INDEXES):
+        op.drop_index(name, table_name=table)
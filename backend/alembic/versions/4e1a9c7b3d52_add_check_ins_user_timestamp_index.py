@@ -0,0 +1,36 @@
+"""Add user/timestamp index on check_ins
+
+Revision ID: 4e1a9c7b3d52
+Revises: 9d8f3b6a2e17
+Create Date: 2026-10-14 11:42:18.563204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4e1a9c7b3d52'
+down_revision: Union[str, Sequence[str], None] = '9d8f3b6a2e17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The 72h check-in window used by daily insights becomes a bounded range scan.
+    # Only the small columns are INCLUDEd: text_content is free-form and could
+    # push index tuples past the btree size limit.
+    op.create_index(
+        'ix_check_ins_user_timestamp',
+        'check_ins',
+        ['user_id', sa.text('timestamp DESC')],
+        postgresql_include=['mood_state', 'energy_level'],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_check_ins_user_timestamp', table_name='check_ins')
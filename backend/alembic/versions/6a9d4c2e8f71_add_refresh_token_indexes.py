@@ -0,0 +1,31 @@
+"""Add user/family and expiry indexes on refresh_tokens
+
+Revision ID: 6a9d4c2e8f71
+Revises: e3c7a1f95b28
+Create Date: 2026-10-14 13:02:47.391058
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6a9d4c2e8f71'
+down_revision: Union[str, Sequence[str], None] = 'e3c7a1f95b28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Families are fresh uuid4s per rotation, so (user, family) is unique by construction
+    op.create_index('ix_refresh_tokens_user_family', 'refresh_tokens', ['user_id', 'token_family'], unique=True)
+    op.create_index('ix_refresh_tokens_expires_at', 'refresh_tokens', ['expires_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_refresh_tokens_expires_at', table_name='refresh_tokens')
+    op.drop_index('ix_refresh_tokens_user_family', table_name='refresh_tokens')
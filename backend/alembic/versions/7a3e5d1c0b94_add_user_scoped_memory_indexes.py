@@ -0,0 +1,34 @@
+"""Add user-scoped indexes on facts and episodic_memories
+
+Revision ID: 7a3e5d1c0b94
+Revises: 1f4b8c2d9a6e
+Create Date: 2026-10-14 10:31:47.902515
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a3e5d1c0b94'
+down_revision: Union[str, Sequence[str], None] = '1f4b8c2d9a6e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Recent-first lookups scoped to a user become index range scans
+    op.create_index('ix_facts_user_created', 'facts', ['user_id', sa.text('created_at DESC')])
+    op.create_index('ix_episodic_user_created', 'episodic_memories', ['user_id', sa.text('created_at DESC')])
+    # FactCategory is a small enum that is frequently filtered on
+    op.create_index('ix_facts_user_category', 'facts', ['user_id', 'category'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_facts_user_category', table_name='facts')
+    op.drop_index('ix_episodic_user_created', table_name='episodic_memories')
+    op.drop_index('ix_facts_user_created', table_name='facts')
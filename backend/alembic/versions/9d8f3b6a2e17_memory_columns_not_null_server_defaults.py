@@ -0,0 +1,55 @@
+"""Make memory table hot columns NOT NULL with server defaults
+
+Revision ID: 9d8f3b6a2e17
+Revises: c2d7e9f4a185
+Create Date: 2026-10-14 11:05:33.120847
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d8f3b6a2e17'
+down_revision: Union[str, Sequence[str], None] = 'c2d7e9f4a185'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Timestamps stay naive UTC to match the rest of the schema (datetime.utcnow)
+UTC_NOW = "timezone('utc', now())"
+
+# (table, column, type, server default)
+COLUMNS = [
+    ('facts', 'confidence_score', sa.Float(), '1.0'),
+    ('facts', 'reinforcement_count', sa.Integer(), '0'),
+    ('facts', 'created_at', sa.DateTime(), UTC_NOW),
+    ('episodic_memories', 'importance_score', sa.Float(), '0.5'),
+    ('episodic_memories', 'decay_factor', sa.Float(), '1.0'),
+    ('episodic_memories', 'created_at', sa.DateTime(), UTC_NOW),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, column, type_, default in COLUMNS:
+        op.execute(f"UPDATE {table} SET {column} = {default} WHERE {column} IS NULL")
+        op.alter_column(
+            table, column,
+            existing_type=type_,
+            nullable=False,
+            server_default=sa.text(default)
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, column, type_, _ in reversed(COLUMNS):
+        op.alter_column(
+            table, column,
+            existing_type=type_,
+            nullable=True,
+            server_default=None
+        )
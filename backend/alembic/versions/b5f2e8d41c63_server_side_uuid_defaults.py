@@ -0,0 +1,33 @@
+"""Generate random primary keys server-side with gen_random_uuid()
+
+Revision ID: b5f2e8d41c63
+Revises: 4e1a9c7b3d52
+Create Date: 2026-10-14 12:08:51.274930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5f2e8d41c63'
+down_revision: Union[str, Sequence[str], None] = '4e1a9c7b3d52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Tables keyed by random v4 ids; the uuid7-keyed tables keep generating ids in Python
+TABLES = ('users', 'refresh_tokens', 'companion_contexts', 'patients', 'colleagues', 'events')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in TABLES:
+        op.alter_column(table, 'id', server_default=sa.text('gen_random_uuid()'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TABLES:
+        op.alter_column(table, 'id', server_default=None)
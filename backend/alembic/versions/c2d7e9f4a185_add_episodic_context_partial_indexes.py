@@ -0,0 +1,38 @@
+"""Add partial indexes on episodic_memories.context_type
+
+Revision ID: c2d7e9f4a185
+Revises: 7a3e5d1c0b94
+Create Date: 2026-10-14 10:48:19.655031
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2d7e9f4a185'
+down_revision: Union[str, Sequence[str], None] = '7a3e5d1c0b94'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # context_type is low-cardinality: partial indexes stay a fraction of the
+    # size of a full btree and only cover the rows that are actually filtered.
+    op.create_index(
+        'ix_episodic_session', 'episodic_memories', ['user_id', 'created_at'],
+        postgresql_where=sa.text("context_type = 'session'")
+    )
+    op.create_index(
+        'ix_episodic_conversation_fragment', 'episodic_memories', ['user_id', 'created_at'],
+        postgresql_where=sa.text("context_type = 'conversation_fragment'")
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_episodic_conversation_fragment', table_name='episodic_memories')
+    op.drop_index('ix_episodic_session', table_name='episodic_memories')
@@ -0,0 +1,48 @@
+"""Fill created_at/updated_at server-side
+
+Revision ID: e3c7a1f95b28
+Revises: b5f2e8d41c63
+Create Date: 2026-10-14 12:36:04.718392
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3c7a1f95b28'
+down_revision: Union[str, Sequence[str], None] = 'b5f2e8d41c63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Timestamps stay naive UTC to match the rest of the schema (datetime.utcnow)
+UTC_NOW = "timezone('utc', now())"
+
+# (table, column)
+COLUMNS = [
+    ('users', 'created_at'),
+    ('users', 'updated_at'),
+    ('refresh_tokens', 'created_at'),
+    ('companion_contexts', 'created_at'),
+    ('companion_contexts', 'updated_at'),
+    ('insights', 'created_at'),
+    ('patients', 'created_at'),
+    ('colleagues', 'created_at'),
+    ('events', 'created_at'),
+    ('chat_conversations', 'created_at'),
+    ('chat_conversations', 'updated_at'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, column in COLUMNS:
+        op.alter_column(table, column, existing_type=sa.DateTime(), server_default=sa.text(UTC_NOW))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, column in reversed(COLUMNS):
+        op.alter_column(table, column, existing_type=sa.DateTime(), server_default=None)
@@ -1,14 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Response, Cookie
-from pydantic import BaseModel, EmailStr
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response, Cookie
+from pydantic import BaseModel
+from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
-from jose import JWTError
+from jwt import InvalidTokenError
 
 from app.infrastructure.database import get_db
-from app.services.auth_service import AuthService
+from app.services.auth_service import auth_service
 from app.domain.user import User, UserCreate, UserLogin, Token
 from app.infrastructure.auth import decode_refresh_token
-from app.api.dependencies import get_current_user
+from app.infrastructure.tables import UserModel
+from app.api.dependencies import get_current_user, invalidate_cached_user
+from app.api.http_cache import conditional_json
 from app.config import settings
 import logging
 
@@ -17,6 +20,38 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
+REFRESH_COOKIE_MAX_AGE = settings.REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60  # seconds
+
+
+def _update_user_returning(user_id, **values):
+    """
+    UPDATE the user row and RETURN it in one round-trip.
+
+    get_current_user may already have loaded this UserModel into the
+    request session; populate_existing makes the RETURNING values
+    overwrite that identity-map copy instead of handing back stale data.
+    """
+    return (
+        update(UserModel)
+        .where(UserModel.id == user_id)
+        .values(**values)
+        .returning(UserModel)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+
+
+def _set_refresh_cookie(response: Response, token: str) -> None:
+    """Set the refresh token as an HTTP-only cookie."""
+    response.set_cookie(
+        key="refresh_token",
+        value=token,
+        httponly=True,
+        secure=False,  # Set to True in production with HTTPS
+        samesite="lax",  # Changed from 'strict' to allow cookies in dev
+        max_age=REFRESH_COOKIE_MAX_AGE,
+        path="/",  # Explicitly set path
+    )
+
 
 @router.post("/register", response_model=dict)
 async def register(
@@ -33,19 +68,10 @@ async def register(
     - Issues access and refresh tokens
     - Sets HTTP-only cookie for refresh token
     """
-    service = AuthService(db)
-    user, access_token, refresh_token = await service.register_user(user_data)
+    user, access_token, refresh_token = await auth_service.register_user(db, user_data)
     
     # Set refresh token as HTTP-only cookie
-    response.set_cookie(
-        key="refresh_token",
-        value=refresh_token,
-        httponly=True,
-        secure=False,  # Set to True in production with HTTPS
-        samesite="lax",  # Changed from 'strict' to allow cookies in dev
-        max_age=settings.REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60,  # seconds
-        path="/",  # Explicitly set path
-    )
+    _set_refresh_cookie(response, refresh_token)
     
     return {
         "access_token": access_token,
@@ -67,19 +93,10 @@ async def login(
     - Issues new access and refresh tokens
     - Sets HTTP-only cookie for refresh token
     """
-    service = AuthService(db)
-    user, access_token, refresh_token = await service.login_user(credentials)
+    user, access_token, refresh_token = await auth_service.login_user(db, credentials)
     
     # Set refresh token as HTTP-only cookie
-    response.set_cookie(
-        key="refresh_token",
-        value=refresh_token,
-        httponly=True,
-        secure=False,  # Set to True in production with HTTPS
-        samesite="lax",  # Changed from 'strict' to allow cookies in dev
-        max_age=settings.REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60,
-        path="/",  # Explicitly set path
-    )
+    _set_refresh_cookie(response, refresh_token)
     
     return {
         "access_token": access_token,
@@ -105,28 +122,19 @@ async def google_login(
     """
     logger.info("Google login endpoint called")
     try:
-        service = AuthService(db)
-        user, access_token, refresh_token = await service.register_or_login_google_user(login_data.credential)
+        user, access_token, refresh_token = await auth_service.register_or_login_google_user(db, login_data.credential)
         
         # Set refresh token as HTTP-only cookie
-        response.set_cookie(
-            key="refresh_token",
-            value=refresh_token,
-            httponly=True,
-            secure=False,  # Set to True in production with HTTPS
-            samesite="lax",
-            max_age=settings.REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60,
-            path="/",
-        )
+        _set_refresh_cookie(response, refresh_token)
         
-        logger.info(f"Successfully logged in Google user: {user.email}")
+        logger.info("Successfully logged in Google user: %s", user.email)
         return {
             "access_token": access_token,
             "token_type": "bearer",
             "user": user
         }
     except Exception as e:
-        logger.error(f"Error in google_login: {str(e)}", exc_info=True)
+        logger.error("Error in google_login: %s", e, exc_info=True)
         if isinstance(e, HTTPException):
             raise e
         raise HTTPException(
@@ -151,7 +159,7 @@ async def refresh_token(
     """
     logger.info("Refresh token endpoint called")
     try:
-        logger.debug(f"Refresh token from cookie: {refresh_token[:20] if refresh_token else 'None'}...")
+        logger.debug("Refresh token from cookie: %.20s...", refresh_token)
         
         if not refresh_token:
             logger.warning("Refresh token not found in cookies")
@@ -177,8 +185,8 @@ async def refresh_token(
             from uuid import UUID
             user_id = UUID(user_id_str)
             
-        except (JWTError, ValueError) as e:
-            logger.error(f"Failed to decode refresh token: {e}")
+        except (InvalidTokenError, ValueError) as e:
+            logger.error("Failed to decode refresh token: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid refresh token",
@@ -186,29 +194,20 @@ async def refresh_token(
             )
         
         # Refresh tokens (with rotation and theft detection)
-        service = AuthService(db)
-        new_access_token, new_refresh_token = await service.refresh_access_token(
-            token_family, user_id
+        new_access_token, new_refresh_token = await auth_service.refresh_access_token(
+            db, token_family, user_id
         )
         
         # Set new refresh token as HTTP-only cookie
-        response.set_cookie(
-            key="refresh_token",
-            value=new_refresh_token,
-            httponly=True,
-            secure=False,  # Set to True in production with HTTPS
-            samesite="lax",  # Changed from 'strict' to allow cookies in dev
-            max_age=settings.REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60,
-            path="/",  # Explicitly set path
-        )
+        _set_refresh_cookie(response, new_refresh_token)
         
-        logger.info(f"Successfully refreshed token for user {user_id}")
+        logger.info("Successfully refreshed token for user %s", user_id)
         return {
             "access_token": new_access_token,
             "token_type": "bearer"
         }
     except Exception as e:
-        logger.error(f"Error in refresh_token: {str(e)}", exc_info=True)
+        logger.error("Error in refresh_token: %s", e, exc_info=True)
         if isinstance(e, HTTPException):
             raise e
         raise HTTPException(
@@ -236,11 +235,12 @@ async def logout(
             token_family = payload.get("family")
             
             if token_family:
-                service = AuthService(db)
-                await service.revoke_refresh_token(token_family)
-        except JWTError:
+                await auth_service.revoke_refresh_token(db, token_family)
+        except InvalidTokenError:
             pass  # Token already invalid, just clear cookie
     
+    invalidate_cached_user(current_user.id)
+    
     # Clear refresh token cookie
     response.delete_cookie(key="refresh_token")
     
@@ -249,14 +249,15 @@ async def logout(
 
 @router.get("/me", response_model=User)
 async def get_current_user_profile(
+    request: Request,
     current_user: User = Depends(get_current_user)
 ):
     """
     Get current authenticated user's profile.
     
-    Requires valid access token.
+    Requires valid access token. Supports If-None-Match (304 when unchanged).
     """
-    return current_user
+    return conditional_json(request, current_user.model_dump_json().encode())
 
 
 class UpdateLanguageRequest(BaseModel):
@@ -275,9 +276,6 @@ async def update_user_language(
     
     Supported languages: en, es
     """
-    from sqlalchemy import update
-    from app.infrastructure.tables import UserModel
-    
     # Validate language
     if request.language not in ["en", "es"]:
         raise HTTPException(
@@ -286,20 +284,12 @@ async def update_user_language(
         )
     
     # Update user language
-    stmt = (
-        update(UserModel)
-        .where(UserModel.id == current_user.id)
-        .values(language=request.language)
-    )
-    await db.execute(stmt)
-    await db.commit()
-    
-    # Fetch updated user
-    from sqlalchemy import select
-    result = await db.execute(select(UserModel).where(UserModel.id == current_user.id))
+    result = await db.execute(_update_user_returning(current_user.id, language=request.language))
     updated_user = result.scalar_one()
+    await db.commit()
+    invalidate_cached_user(current_user.id)
     
-    logger.info(f"Updated language to {request.language} for user {current_user.id}")
+    logger.info("Updated language to %s for user %s", request.language, current_user.id)
     return updated_user
 
 
@@ -323,31 +313,22 @@ async def complete_onboarding(
     - Coping style
     - Sets onboarding_completed flag to True
     """
-    from sqlalchemy import update
-    from app.infrastructure.tables import UserModel
-    
     # Update user with onboarding data
-    stmt = (
-        update(UserModel)
-        .where(UserModel.id == current_user.id)
-        .values(
-            language=data.language,
-            full_name=data.full_name,
-            professional_role=data.professional_role,
-            years_experience=data.years_experience,
-            primary_stressor=data.primary_stressor,
-            coping_style=data.coping_style,
-            onboarding_completed=True
-        )
+    stmt = _update_user_returning(
+        current_user.id,
+        language=data.language,
+        full_name=data.full_name,
+        professional_role=data.professional_role,
+        years_experience=data.years_experience,
+        primary_stressor=data.primary_stressor,
+        coping_style=data.coping_style,
+        onboarding_completed=True
     )
-    await db.execute(stmt)
-    await db.commit()
-    
-    # Fetch updated user
-    from sqlalchemy import select
-    result = await db.execute(select(UserModel).where(UserModel.id == current_user.id))
+    result = await db.execute(stmt)
     updated_user = result.scalar_one()
+    await db.commit()
+    invalidate_cached_user(current_user.id)
     
-    logger.info(f"Completed onboarding for user {current_user.id} - Role: {data.professional_role}, Lang: {data.language}")
+    logger.info("Completed onboarding for user %s - Role: %s, Lang: %s", current_user.id, data.professional_role, data.language)
     return updated_user
 
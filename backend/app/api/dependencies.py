@@ -1,43 +1,65 @@
-from fastapi import Depends, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi import Depends, Header, HTTPException, status
+from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from jose import JWTError
+from jwt import InvalidTokenError
 from uuid import UUID
+from cachetools import TTLCache
 
 from app.infrastructure.database import get_db
 from app.infrastructure.auth import decode_access_token
-from app.services.auth_service import AuthService
+from app.services.auth_service import auth_service
 from app.domain.user import User
 
 
-# HTTP Bearer token scheme
-security = HTTPBearer()
+# Built once and re-raised for every rejected token
+credentials_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+# Short-lived cache of authenticated users, keyed by user ID.
+# Saves one SELECT per authenticated request; entries expire after 30s
+# and are dropped explicitly whenever the user row changes.
+_user_cache: TTLCache = TTLCache(maxsize=50_000, ttl=30)
+
+# Bumped on every invalidation. A cache fill that started before the bump
+# (its DB read may predate the update) must not store its result. One int
+# per user that has ever been invalidated, so this stays small.
+_user_generation: dict[UUID, int] = {}
+
+
+def invalidate_cached_user(user_id: UUID) -> None:
+    """
+    Drop a user from the auth cache so the next request re-reads the DB.
+    
+    Args:
+        user_id: User's UUID
+    """
+    _user_generation[user_id] = _user_generation.get(user_id, 0) + 1
+    _user_cache.pop(user_id, None)
 
 
 async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
+    authorization: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_db)
 ) -> User:
     """
     Dependency to get the current authenticated user from JWT token.
     
     Args:
-        credentials: Bearer token from Authorization header
+        authorization: Raw Authorization header ("Bearer <token>")
         db: Database session
         
     Returns:
         Authenticated user
         
     Raises:
-        HTTPException: 401 if token is invalid or user not found
+        HTTPException: 401 if token is missing, invalid or user not found
     """
-    token = credentials.credentials
-    
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+    if not authorization or not authorization.startswith("Bearer "):
+        raise credentials_exception
+    token = authorization[7:]
     
     try:
         # Decode and validate token
@@ -47,15 +69,21 @@ async def get_current_user(
             raise credentials_exception
         
         user_id = UUID(user_id_str)
-    except (JWTError, ValueError):
+    except (InvalidTokenError, ValueError):
         raise credentials_exception
     
-    # Get user from database
-    auth_service = AuthService(db)
-    user = await auth_service.get_user_by_id(user_id)
-    
+    # Get user from cache, falling back to the database
+    user = _user_cache.get(user_id)
     if user is None:
-        raise credentials_exception
+        generation = _user_generation.get(user_id, 0)
+        user = await auth_service.get_user_by_id(db, user_id)
+        
+        if user is None:
+            raise credentials_exception
+        
+        # Skip the store if the user was invalidated while we were reading
+        if _user_generation.get(user_id, 0) == generation:
+            _user_cache[user_id] = user
     
     if not user.is_active:
         raise HTTPException(
@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.infrastructure.database import get_db
+from app.infrastructure.database import get_db, AsyncSessionLocal
 from app.api.dependencies import get_current_user
 from app.domain.user import User
 from app.services.analysis_service import AnalysisService
@@ -35,23 +36,23 @@ async def get_daily_insight(
         gentle_suggestion=insight.gentle_suggestion
     )
 
+# Strong references to in-flight background jobs so they aren't garbage collected
+_background_jobs: set[asyncio.Task] = set()
+
+
+async def _process_memory(conversation_id: UUID):
+    # The job outlives the request, so it must not borrow the request session
+    async with AsyncSessionLocal() as bg_db:
+        await MemoryService(bg_db).process_conversation_background(conversation_id)
+
+
 @router.post("/process-memory/{conversation_id}")
 async def trigger_memory_processing(
     conversation_id: UUID,
-    background_tasks: BackgroundTasks,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user)
 ):
     """Manually triggers background memory processing for a conversation (Dev/Debug)."""
-    service = MemoryService(db)
-    
-    # We run this in background
-    async def _process():
-        # Re-instantiate service/db in background task if needed or pass session carefully.
-        # FastAPI background tasks with async session can be tricky if session closes.
-        # For MVP sync/await here is safer or we use a fresh dependency injection pattern.
-        # We'll stick to await for MVP to ensure completion.
-        await service.process_conversation_background(conversation_id)
-        
-    background_tasks.add_task(_process)
+    task = asyncio.create_task(_process_memory(conversation_id))
+    _background_jobs.add(task)
+    task.add_done_callback(_background_jobs.discard)
     return {"status": "Processing started"}
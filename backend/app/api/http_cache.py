@@ -0,0 +1,51 @@
+import hashlib
+from typing import Optional
+from fastapi import Request, Response
+
+
+def _if_none_match_hits(header: Optional[str], opaque_tag: str) -> bool:
+    """
+    Weak If-None-Match comparison (RFC 9110 13.1.2): the header may be "*"
+    or a comma-separated list of tags, and W/ prefixes are ignored.
+    """
+    if not header:
+        return False
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == opaque_tag:
+            return True
+    return False
+
+
+def conditional_json(request: Request, body: bytes) -> Response:
+    """
+    Build a JSON response with a weak ETag, or a bare 304 if the client's
+    If-None-Match already matches.
+
+    The ETag is a digest of the body itself: several payloads (patient load
+    and trend, companion context) are derived from other tables, so no single
+    updated_at column reliably tracks them.
+
+    Args:
+        request: Incoming request (for If-None-Match)
+        body: Serialized JSON payload
+
+    Returns:
+        200 response with the body, or 304 with no body
+    """
+    opaque_tag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    etag = f"W/{opaque_tag}"
+    headers = {
+        "ETag": etag,
+        # Per-user data: browsers may keep it but must revalidate every time
+        "Cache-Control": "private, no-cache",
+    }
+
+    if _if_none_match_hits(request.headers.get("if-none-match"), opaque_tag):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)
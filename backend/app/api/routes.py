@@ -1,13 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import orjson
+from fastapi import APIRouter, Body, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.infrastructure.database import get_db
-from app.services.companion_service import CompanionService
+from app.infrastructure.database import get_db, in_own_session
+from app.services.companion_service import companion_service
 from app.domain.models import CompanionContext, CheckIn, CheckInIntent, MoodState
 from app.domain.user import User
 from app.api.dependencies import get_current_user
+from app.api.http_cache import conditional_json
 from uuid import UUID
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field, TypeAdapter
+from typing import AsyncIterator, Optional
 
 router = APIRouter(prefix="/companion", tags=["companion"])
 
@@ -18,7 +22,7 @@ class CheckInCreate(BaseModel):
     context_id: Optional[str] = None
     intent: CheckInIntent
     mood_state: Optional[MoodState] = None
-    energy_level: Optional[int] = None
+    energy_level: Optional[int] = Field(None, ge=1, le=10)
     text_content: Optional[str] = None
 
 
@@ -31,13 +35,14 @@ class InsightRequest(BaseModel):
 
 @router.get("/context", response_model=CompanionContext)
 async def get_companion_context(
+    request: Request,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Get current user's companion context."""
-    service = CompanionService(db)
-    context = await service.get_or_create_context(current_user.id)
-    return context
+    context = await companion_service.get_or_create_context(db, current_user.id)
+    body = CompanionContext.model_validate(context).model_dump_json().encode()
+    return conditional_json(request, body)
 
 
 @router.post("/check-in", response_model=CheckIn)
@@ -47,16 +52,37 @@ async def submit_check_in(
     db: AsyncSession = Depends(get_db)
 ):
     """Submit a check-in for the authenticated user."""
-    # Add user_id from authenticated user
-    data = check_in_data.model_dump()
-    data['user_id'] = current_user.id
-    domain_check_in = CheckIn(**data)
+    # Add user_id from authenticated user. The DTO was already validated by
+    # FastAPI with the same constraints, so skip re-validation.
+    domain_check_in = CheckIn.model_construct(**check_in_data.__dict__, user_id=current_user.id)
     
-    service = CompanionService(db)
-    result = await service.record_check_in(domain_check_in)
+    result = await companion_service.record_check_in(db, domain_check_in)
     return result
 
 
+# Upper bound for one import request; larger backfills are sent in batches
+MAX_BULK_CHECK_INS = 1000
+
+
+class BulkCheckInResult(BaseModel):
+    inserted: int
+
+
+@router.post("/check-ins/bulk", response_model=BulkCheckInResult)
+async def import_check_ins(
+    check_ins: list[CheckInCreate] = Body(..., max_length=MAX_BULK_CHECK_INS),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Import many check-ins (backfills) for the authenticated user in one COPY."""
+    domain_check_ins = [
+        CheckIn.model_construct(**c.__dict__, user_id=current_user.id)
+        for c in check_ins
+    ]
+    inserted = await companion_service.record_check_ins_bulk(db, domain_check_ins)
+    return BulkCheckInResult(inserted=inserted)
+
+
 @router.post("/generate-insight")
 async def trigger_insight(
     request: InsightRequest,
@@ -85,7 +111,24 @@ async def trigger_insight(
 
 # --- Entity Management ---
 from app.domain.entities import PatientCreate, Patient, ColleagueCreate, Colleague, EventCreate, Event
-from app.services.entity_service import EntityService
+from app.services.entity_service import entity_service
+
+# Built once: validating ORM rows and dumping JSON through a single adapter
+# skips FastAPI's per-item response_model validation + jsonable_encoder pass.
+_patients_adapter = TypeAdapter(list[Patient])
+_colleagues_adapter = TypeAdapter(list[Colleague])
+_events_adapter = TypeAdapter(list[Event])
+
+
+class Dashboard(BaseModel):
+    patients: list[Patient]
+    colleagues: list[Colleague]
+    events: list[Event]
+
+
+def _json_list(adapter: TypeAdapter, rows) -> Response:
+    items = adapter.validate_python(rows, from_attributes=True)
+    return Response(content=adapter.dump_json(items), media_type="application/json")
 
 
 @router.post("/patients", response_model=Patient)
@@ -95,18 +138,19 @@ async def create_patient(
     db: AsyncSession = Depends(get_db)
 ):
     """Create a patient for the authenticated user."""
-    service = EntityService(db)
-    return await service.create_patient(current_user.id, data)
+    return await entity_service.create_patient(db, current_user.id, data)
 
 
 @router.get("/patients", response_model=list[Patient])
 async def list_patients(
+    request: Request,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """List all patients for the authenticated user."""
-    service = EntityService(db)
-    return await service.list_patients(current_user.id)
+    patients = await entity_service.list_patients(db, current_user.id)
+    body = _patients_adapter.dump_json(_patients_adapter.validate_python(patients, from_attributes=True))
+    return conditional_json(request, body)
 
 
 @router.get("/patients/{patient_id}/history", response_model=list[CheckIn])
@@ -116,8 +160,7 @@ async def get_patient_history(
     db: AsyncSession = Depends(get_db)
 ):
     """Get check-in history for a specific patient."""
-    service = EntityService(db)
-    return await service.get_patient_history(current_user.id, patient_id)
+    return await entity_service.get_patient_history(db, current_user.id, patient_id)
 
 
 @router.post("/colleagues", response_model=Colleague)
@@ -127,8 +170,7 @@ async def create_colleague(
     db: AsyncSession = Depends(get_db)
 ):
     """Create a colleague for the authenticated user."""
-    service = EntityService(db)
-    return await service.create_colleague(current_user.id, data)
+    return await entity_service.create_colleague(db, current_user.id, data)
 
 
 @router.get("/colleagues", response_model=list[Colleague])
@@ -137,8 +179,7 @@ async def list_colleagues(
     db: AsyncSession = Depends(get_db)
 ):
     """List all colleagues for the authenticated user."""
-    service = EntityService(db)
-    return await service.list_colleagues(current_user.id)
+    return _json_list(_colleagues_adapter, await entity_service.list_colleagues(db, current_user.id))
 
 
 @router.get("/colleagues/{colleague_id}/history", response_model=list[CheckIn])
@@ -148,8 +189,7 @@ async def get_colleague_history(
     db: AsyncSession = Depends(get_db)
 ):
     """Get check-in history for a specific colleague."""
-    service = EntityService(db)
-    return await service.get_colleague_history(current_user.id, colleague_id)
+    return await entity_service.get_colleague_history(db, current_user.id, colleague_id)
 
 
 @router.post("/events", response_model=Event)
@@ -159,8 +199,7 @@ async def create_event(
     db: AsyncSession = Depends(get_db)
 ):
     """Create an event for the authenticated user."""
-    service = EntityService(db)
-    return await service.create_event(current_user.id, data)
+    return await entity_service.create_event(db, current_user.id, data)
 
 
 @router.get("/events", response_model=list[Event])
@@ -169,11 +208,54 @@ async def list_events(
     db: AsyncSession = Depends(get_db)
 ):
     """List all events for the authenticated user."""
-    service = EntityService(db)
-    return await service.list_events(current_user.id)
+    return _json_list(_events_adapter, await entity_service.list_events(db, current_user.id))
+
+
+@router.get("/dashboard", response_model=Dashboard)
+async def get_dashboard(
+    request: Request,
+    current_user: User = Depends(get_current_user)
+):
+    """Patients, colleagues and events in one response for the initial SPA load."""
+    patients, colleagues, events = await asyncio.gather(
+        in_own_session(entity_service.list_patients, current_user.id),
+        in_own_session(entity_service.list_colleagues, current_user.id),
+        in_own_session(entity_service.list_events, current_user.id),
+    )
+    dashboard = Dashboard.model_validate(
+        {"patients": patients, "colleagues": colleagues, "events": events},
+        from_attributes=True
+    )
+    return conditional_json(request, dashboard.model_dump_json().encode())
 
 
 # --- Chat ---
+# Keep proxies (nginx) and browsers from caching or buffering the event stream
+_SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+async def _sse_events(chunks: AsyncIterator[str], fallback: str) -> AsyncIterator[bytes]:
+    """
+    Wraps text chunks as Server-Sent Events, ending with a 'done' event.
+
+    If the stream fails, an 'error' event is sent instead of 'done'. The
+    fallback text is only sent as a delta when nothing has been streamed
+    yet, so a partial reply never gets the apology glued onto its end.
+    """
+    sent = False
+    try:
+        async for chunk in chunks:
+            sent = True
+            yield b"data: " + orjson.dumps({"delta": chunk}) + b"\n\n"
+    except Exception:
+        # The service already logged the failure
+        if not sent:
+            yield b"data: " + orjson.dumps({"delta": fallback}) + b"\n\n"
+        yield b"event: error\ndata: " + orjson.dumps({"detail": fallback}) + b"\n\n"
+        return
+    yield b"event: done\ndata: {}\n\n"
+
+
 class ChatMessage(BaseModel):
     role: str
     content: str
@@ -197,6 +279,22 @@ async def chat_interaction(
     return {"role": "assistant", "content": response}
 
 
+@router.post("/chat/stream")
+async def chat_interaction_stream(
+    request: ChatRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Streaming variant of /chat: the reply arrives as SSE 'data: {"delta": ...}' events."""
+    from app.services.chat_service import ChatService, FALLBACK_REPLY
+    service = ChatService(db)
+    return StreamingResponse(
+        _sse_events(service.stream_response(current_user.id, request.message), FALLBACK_REPLY),
+        media_type="text/event-stream",
+        headers=_SSE_HEADERS,
+    )
+
+
 # --- Specialized Analysis Chat ---
 class AnalysisChatRequest(BaseModel):
     context_type: str
@@ -212,14 +310,36 @@ async def entity_analysis_chat(
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """Stateless deep analysis for Patients/Colleagues. Now relies on user.language from DB."""
+    """Stateless deep analysis for Patients/Colleagues. Relies on the authenticated user's language."""
     from app.services.analysis_service import AnalysisService
     service = AnalysisService(db)
     response = await service.generate_analysis_response(
-        user_id=current_user.id,
+        user=current_user,
         entity_type=request.context_type,
         entity_id=request.context_id,
         message=request.message,
         history=request.history
     )
     return {"role": "assistant", "content": response}
+
+
+@router.post("/analysis/chat/stream")
+async def entity_analysis_chat_stream(
+    request: AnalysisChatRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Streaming variant of /analysis/chat (SSE)."""
+    from app.services.analysis_service import AnalysisService, ANALYSIS_FALLBACK_REPLY
+    service = AnalysisService(db)
+    return StreamingResponse(
+        _sse_events(service.stream_analysis_response(
+            user=current_user,
+            entity_type=request.context_type,
+            entity_id=request.context_id,
+            message=request.message,
+            history=request.history
+        ), ANALYSIS_FALLBACK_REPLY),
+        media_type="text/event-stream",
+        headers=_SSE_HEADERS,
+    )
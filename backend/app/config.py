@@ -19,7 +19,10 @@ class Settings(BaseSettings):
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
     
     # Security
-    BCRYPT_ROUNDS: int = 12
+    ARGON2_TIME_COST: int = 2
+    ARGON2_MEMORY_COST: int = 19456  # KiB
+    ARGON2_PARALLELISM: int = 1
+    PASSWORD_HASH_CONCURRENCY: int = 4  # Max argon2 hashes/verifies running at once
     GOOGLE_CLIENT_ID: Optional[str] = None
     
     # CORS
@@ -0,0 +1,14 @@
+from datetime import datetime, timezone
+
+
+def utc_now() -> datetime:
+    """
+    Current time as a naive UTC datetime.
+
+    Our timestamp columns are "timestamp without time zone" holding UTC, so
+    values stay naive. Replaces datetime.utcnow(), deprecated in Python 3.12.
+
+    Returns:
+        Naive datetime in UTC
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
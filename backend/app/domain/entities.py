@@ -1,6 +1,6 @@
 from datetime import datetime, date
 from uuid import UUID
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ConfigDict
 from typing import Optional, Literal
 
 class PatientCreate(BaseModel):
@@ -19,6 +19,8 @@ class Patient(PatientCreate):
     created_at: datetime
     trend: Optional[str] = None # 'improving', 'stable', 'declining'
 
+    model_config = ConfigDict(from_attributes=True, extra='ignore')
+
 class ColleagueCreate(BaseModel):
     name: str
     relationship_type: str
@@ -28,6 +30,8 @@ class Colleague(ColleagueCreate):
     user_id: UUID
     created_at: datetime
 
+    model_config = ConfigDict(from_attributes=True, extra='ignore')
+
 class EventCreate(BaseModel):
     title: str
     event_date: datetime
@@ -37,3 +41,6 @@ class Event(EventCreate):
     id: UUID
     user_id: UUID
     created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True, extra='ignore')
+
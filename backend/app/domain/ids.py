@@ -0,0 +1,25 @@
+import os
+import time
+import uuid
+
+
+def uuid7() -> uuid.UUID:
+    """
+    Generate a time-ordered UUIDv7 (RFC 9562).
+
+    The top 48 bits are the Unix timestamp in milliseconds, so new rows land
+    at the right edge of the primary-key B-tree instead of at random pages.
+    The remaining 74 bits are random.
+
+    Returns:
+        A version 7 UUID
+    """
+    unix_ts_ms = time.time_ns() // 1_000_000
+    rand = int.from_bytes(os.urandom(10), "big")
+
+    value = (unix_ts_ms & 0xFFFF_FFFF_FFFF) << 80
+    value |= 0x7 << 76                          # version
+    value |= ((rand >> 62) & 0xFFF) << 64       # rand_a (12 bits)
+    value |= 0b10 << 62                         # RFC 4122 variant
+    value |= rand & 0x3FFF_FFFF_FFFF_FFFF       # rand_b (62 bits)
+    return uuid.UUID(int=value)
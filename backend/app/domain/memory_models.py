@@ -1,5 +1,6 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ConfigDict, AliasChoices
 from typing import List, Optional, Dict, Any, Literal
+from typing_extensions import TypedDict # pydantic needs this one on Python < 3.12
 from uuid import UUID
 from datetime import datetime
 
@@ -20,6 +21,16 @@ class Fact(FactCreate):
     created_at: datetime
     last_reinforced_at: Optional[datetime] = None
     reinforcement_count: int = 0
+    # FactModel maps the "metadata" column to metadata_ (Base.metadata is reserved)
+    metadata: Dict[str, Any] = Field(default_factory=dict, validation_alias=AliasChoices("metadata_", "metadata"))
+
+    model_config = ConfigDict(from_attributes=True, extra='ignore', populate_by_name=True)
+
+class StmTurn(TypedDict):
+    """One turn of the Redis short-term memory window."""
+    role: str
+    content: str
+    timestamp: datetime # stored in Redis as ISO-8601, naive UTC
 
 class UserProfileTraits(BaseModel):
     communication_style: List[str] = Field(default_factory=list) # e.g. ["direct", "verbose"]
@@ -45,3 +56,6 @@ class EpisodicMemory(EpisodicMemoryCreate):
     user_id: UUID
     created_at: datetime
     decay_factor: float = 1.0
+
+    model_config = ConfigDict(from_attributes=True, extra='ignore')
+
@@ -1,10 +1,16 @@
 from datetime import datetime
 from enum import Enum
-from typing import List, Optional
-from uuid import UUID, uuid4
+from typing import List, Literal, Optional
+from typing_extensions import TypedDict # pydantic needs this one on Python < 3.12
+from uuid import UUID
 from pydantic import BaseModel, Field, ConfigDict
+from app.domain.clock import utc_now
+from app.domain.ids import uuid7
 
 # --- Value Objects ---
+# Plain str Enums on purpose: pydantic-core validates them natively with a
+# value lookup in Rust. A Python "before" validator over a value->member map
+# measured ~10-25% slower, and Literal[...] no faster.
 
 class CheckInIntent(str, Enum):
     RELEASE = "RELEASE"         # Venting
@@ -33,9 +39,9 @@ class CheckIn(BaseModel):
     """
     A distinct atomic event where the user logs data about a Context.
     """
-    id: UUID = Field(default_factory=uuid4)
+    id: UUID = Field(default_factory=uuid7)
     user_id: UUID
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    timestamp: datetime = Field(default_factory=utc_now)
     
     # Context
     context_type: str  # e.g., "PATIENT", "COLLEAGUE", "EVENT", "SELF"
@@ -47,15 +53,15 @@ class CheckIn(BaseModel):
     energy_level: Optional[int] = Field(None, ge=1, le=10)
     text_content: Optional[str] = None
     
-    model_config = ConfigDict(from_attributes=True)
+    model_config = ConfigDict(from_attributes=True, frozen=True)
 
 class Insight(BaseModel):
     """
     AI-generated reflection. strictly analytical/supportive.
     """
-    id: UUID = Field(default_factory=uuid4)
+    id: UUID = Field(default_factory=uuid7)
     target_check_in_id: Optional[UUID] = None
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=utc_now)
     
     type: InsightType
     
@@ -64,7 +70,7 @@ class Insight(BaseModel):
     validation: str
     gentle_suggestion: Optional[str] = None
     
-    model_config = ConfigDict(from_attributes=True)
+    model_config = ConfigDict(from_attributes=True, frozen=True)
 
 class CompanionContext(BaseModel):
     """
@@ -89,27 +95,55 @@ class ChatMessage(BaseModel):
     """
     Atomic message in a conversation.
     """
-    id: UUID = Field(default_factory=uuid4)
+    id: UUID = Field(default_factory=uuid7)
     role: str # 'user' or 'assistant'
     content: str
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    timestamp: datetime = Field(default_factory=utc_now)
     
-    model_config = ConfigDict(from_attributes=True)
+    model_config = ConfigDict(from_attributes=True, frozen=True)
+
+class ChatMessageDict(TypedDict):
+    """
+    Lightweight message shape used inside ChatConversation.
+    Validated as a TypedDict (much cheaper than a nested model per message);
+    use ChatMessage.model_construct(**msg) where a full model is needed.
+    """
+    id: UUID
+    role: Literal["user", "assistant"]
+    content: str
+    timestamp: datetime
 
 class ChatConversation(BaseModel):
     """
     Longitudinal conversation container.
+
+    `messages` holds plain dicts, not ChatMessage models: when hydrating from
+    ORM rows, convert each message to a dict first (TypedDicts can't be read
+    from attributes).
     """
-    id: UUID = Field(default_factory=uuid4)
+    id: UUID = Field(default_factory=uuid7)
     user_id: UUID
     title: Optional[str] = None
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=utc_now)
+    updated_at: datetime = Field(default_factory=utc_now)
     
     # Recycled Context
     last_summary: Optional[str] = None
     extracted_themes: Optional[str] = None
     
-    messages: List[ChatMessage] = []
+    messages: List[ChatMessageDict] = []
     
     model_config = ConfigDict(from_attributes=True)
+
+class ChatConversationSoA(BaseModel):
+    """
+    Column-oriented (struct-of-arrays) view of a conversation's messages,
+    for scans that only read a few fields. The i-th message is
+    (message_ids[i], roles[i], contents[i], timestamps[i]), oldest first.
+    """
+    conversation_id: UUID
+    user_id: UUID
+    message_ids: List[UUID] = []
+    roles: List[str] = []
+    contents: List[str] = []
+    timestamps: List[datetime] = []
@@ -1,8 +1,35 @@
+"""
+User domain models.
+
+`User` is built two ways. Untrusted input (request bodies, DTOs below) always
+goes through normal validation. Rows read back from our own database were
+validated when they were written, so `User.from_orm_trusted` copies their
+attributes with `model_construct` and skips validation. Only use it for data
+that came out of the `users` table.
+"""
 from datetime import datetime
 from enum import Enum
-from typing import Optional
+from functools import lru_cache
+from typing import Annotated, Optional
 from uuid import UUID
-from pydantic import BaseModel, EmailStr, Field, ConfigDict
+from pydantic import AfterValidator, BaseModel, Field, ConfigDict, WithJsonSchema
+from pydantic.networks import validate_email
+
+
+@lru_cache(maxsize=10_000)
+def _normalize_email(value: str) -> str:
+    # Same parsing/normalization as EmailStr, memoized: a login burst for
+    # the same address skips the email-validator work after the first call.
+    return validate_email(value)[1]
+
+
+# Drop-in for EmailStr on request DTOs. Only use it at the API boundary -
+# emails read back from the database are already normalized plain str.
+NormalizedEmail = Annotated[
+    str,
+    AfterValidator(_normalize_email),
+    WithJsonSchema({"type": "string", "format": "email"}),
+]
 
 
 class User(BaseModel):
@@ -24,17 +51,22 @@ class User(BaseModel):
     
     model_config = ConfigDict(from_attributes=True)
 
+    @classmethod
+    def from_orm_trusted(cls, orm_obj) -> "User":
+        """Build from a UserModel row without re-validating its fields."""
+        return cls.model_construct(**{name: getattr(orm_obj, name) for name in cls.model_fields})
+
 
 class UserCreate(BaseModel):
     """DTO for user registration."""
-    email: EmailStr
+    email: NormalizedEmail
     password: str
     full_name: Optional[str] = None
 
 
 class UserLogin(BaseModel):
     """DTO for user login."""
-    email: EmailStr
+    email: NormalizedEmail
     password: str
 
 
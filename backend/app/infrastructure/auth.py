@@ -1,32 +1,47 @@
 import bcrypt
-from datetime import datetime, timedelta
+import hashlib
+import re
+import time
+from datetime import timedelta
 from typing import Optional
 from uuid import UUID
-from jose import JWTError, jwt
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from cachetools import TLRUCache
+import jwt
+from jwt import InvalidTokenError
 from app.config import settings
 
 
-# Password hashing with bcrypt directly to avoid passlib incompatibility
+# Password hashing with argon2id. Hashes created before the switch are bcrypt
+# ("$2b$..." prefix) and are still verified until the user logs in again.
+password_hasher = PasswordHasher(
+    time_cost=settings.ARGON2_TIME_COST,
+    memory_cost=settings.ARGON2_MEMORY_COST,
+    parallelism=settings.ARGON2_PARALLELISM,
+)
+
+
 def get_password_hash(password: str) -> str:
     """
-    Hash a password using bcrypt.
+    Hash a password using argon2id.
+    
+    CPU-bound: call from a worker thread, not the event loop.
     
     Args:
         password: Plain text password
         
     Returns:
-        Hashed password string (decoded to utf-8)
+        Encoded argon2id hash string
     """
-    # bcrypt requires bytes
-    pwd_bytes = password.encode('utf-8')
-    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
-    hashed_bytes = bcrypt.hashpw(pwd_bytes, salt)
-    return hashed_bytes.decode('utf-8')
+    return password_hasher.hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
-    Verify a password against its hash.
+    Verify a password against its hash (argon2id or legacy bcrypt).
+    
+    CPU-bound: call from a worker thread, not the event loop.
     
     Args:
         plain_password: Plain text password to verify
@@ -35,9 +50,39 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     Returns:
         True if password matches, False otherwise
     """
-    pwd_bytes = plain_password.encode('utf-8')
-    hash_bytes = hashed_password.encode('utf-8')
-    return bcrypt.checkpw(pwd_bytes, hash_bytes)
+    if hashed_password.startswith("$2"):
+        return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+    
+    try:
+        return password_hasher.verify(hashed_password, plain_password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """
+    Check whether a stored hash should be upgraded to the current parameters.
+    
+    Args:
+        hashed_password: Stored hash
+        
+    Returns:
+        True for legacy bcrypt hashes or outdated argon2 parameters
+    """
+    if hashed_password.startswith("$2"):
+        return True
+    return password_hasher.check_needs_rehash(hashed_password)
+
+
+# Verified against when the email is unknown, so a failed login takes the
+# same time whether or not the account exists.
+DUMMY_PASSWORD_HASH = password_hasher.hash("dummy-password-for-timing")
+
+
+# Fast path for the common (valid) case: one C-level match. ASCII classes are
+# a subset of str.isupper/islower/isdigit, so a match is always valid; a
+# miss falls through to the exact Unicode-aware scan below.
+_STRONG_PASSWORD_RE = re.compile(r"(?=.*[A-Z])(?=.*[a-z])(?=.*[0-9])", re.DOTALL)
 
 
 def validate_password_strength(password: str) -> tuple[bool, Optional[str]]:
@@ -59,16 +104,46 @@ def validate_password_strength(password: str) -> tuple[bool, Optional[str]]:
     if len(password) < 8:
         return False, "Password must be at least 8 characters long"
     
-    if not any(c.isupper() for c in password):
+    if _STRONG_PASSWORD_RE.match(password):
+        return True, None
+    
+    # Single pass: fold the character classes seen into a bitmask and stop
+    # as soon as all three are present
+    seen = 0
+    for c in password:
+        if c.isupper():
+            seen |= 1
+        elif c.islower():
+            seen |= 2
+        elif c.isdigit():
+            seen |= 4
+        else:
+            continue
+        if seen == 7:
+            return True, None
+    
+    if not seen & 1:
         return False, "Password must contain at least one uppercase letter"
     
-    if not any(c.islower() for c in password):
+    if not seen & 2:
         return False, "Password must contain at least one lowercase letter"
     
-    if not any(c.isdigit() for c in password):
-        return False, "Password must contain at least one number"
-    
-    return True, None
+    return False, "Password must contain at least one number"
+
+
+# Token lifetimes and decode options, resolved once instead of per call.
+# PyJWT signs HS256 through hmac/OpenSSL; "require" rejects tokens that are
+# missing a claim before the type check runs.
+ACCESS_TOKEN_TTL_SECONDS = int(timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES).total_seconds())
+REFRESH_TOKEN_TTL_SECONDS = int(timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS).total_seconds())
+_DECODE_ALGORITHMS = [settings.ALGORITHM]
+_ACCESS_DECODE_OPTIONS = {"require": ["exp", "iat", "sub", "type"]}
+_REFRESH_DECODE_OPTIONS = {"require": ["exp", "iat", "sub", "family", "type"]}
+
+# Claim templates (key order = payload order); each token copies one and
+# fills in the per-call values
+_ACCESS_CLAIMS_TEMPLATE = {"sub": None, "exp": None, "iat": None, "type": "access"}
+_REFRESH_CLAIMS_TEMPLATE = {"sub": None, "family": None, "exp": None, "iat": None, "type": "refresh"}
 
 
 def create_access_token(user_id: UUID) -> str:
@@ -81,15 +156,13 @@ def create_access_token(user_id: UUID) -> str:
     Returns:
         Encoded JWT token string
     """
-    expires_delta = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    expire = datetime.utcnow() + expires_delta
+    # Integer epoch claims: one clock read, no datetime objects to convert
+    now = int(time.time())
     
-    to_encode = {
-        "sub": str(user_id),
-        "exp": expire,
-        "iat": datetime.utcnow(),
-        "type": "access"
-    }
+    to_encode = _ACCESS_CLAIMS_TEMPLATE.copy()
+    to_encode["sub"] = str(user_id)
+    to_encode["exp"] = now + ACCESS_TOKEN_TTL_SECONDS
+    to_encode["iat"] = now
     
     encoded_jwt = jwt.encode(
         to_encode,
@@ -110,16 +183,13 @@ def create_refresh_token(user_id: UUID, token_family: str) -> str:
     Returns:
         Encoded JWT token string
     """
-    expires_delta = timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
-    expire = datetime.utcnow() + expires_delta
+    now = int(time.time())
     
-    to_encode = {
-        "sub": str(user_id),
-        "family": token_family,
-        "exp": expire,
-        "iat": datetime.utcnow(),
-        "type": "refresh"
-    }
+    to_encode = _REFRESH_CLAIMS_TEMPLATE.copy()
+    to_encode["sub"] = str(user_id)
+    to_encode["family"] = token_family
+    to_encode["exp"] = now + REFRESH_TOKEN_TTL_SECONDS
+    to_encode["iat"] = now
     
     encoded_jwt = jwt.encode(
         to_encode,
@@ -129,10 +199,22 @@ def create_refresh_token(user_id: UUID, token_family: str) -> str:
     return encoded_jwt
 
 
+# Verified access-token payloads keyed by token digest. Each entry expires
+# at the token's own "exp" claim, so a cached payload is never served past it.
+_access_payload_cache: TLRUCache = TLRUCache(
+    maxsize=10_000,
+    ttu=lambda _key, payload, _now: payload["exp"],
+    timer=time.time,
+)
+
+
 def decode_access_token(token: str) -> dict:
     """
     Decode and validate an access token.
     
+    Repeated tokens are served from a cache, skipping HMAC verification
+    and JSON parsing.
+    
     Args:
         token: JWT token string
         
@@ -140,17 +222,24 @@ def decode_access_token(token: str) -> dict:
         Decoded token payload
         
     Raises:
-        JWTError: If token is invalid or expired
+        InvalidTokenError: If token is invalid or expired
     """
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    payload = _access_payload_cache.get(key)
+    if payload is not None:
+        return payload
+    
     payload = jwt.decode(
         token,
         settings.JWT_SECRET_KEY,
-        algorithms=[settings.ALGORITHM]
+        algorithms=_DECODE_ALGORITHMS,
+        options=_ACCESS_DECODE_OPTIONS
     )
     
-    if payload.get("type") != "access":
-        raise JWTError("Invalid token type")
+    if payload["type"] != "access":
+        raise InvalidTokenError("Invalid token type")
     
+    _access_payload_cache[key] = payload
     return payload
 
 
@@ -165,15 +254,16 @@ def decode_refresh_token(token: str) -> dict:
         Decoded token payload with user_id and family
         
     Raises:
-        JWTError: If token is invalid or expired
+        InvalidTokenError: If token is invalid or expired
     """
     payload = jwt.decode(
         token,
         settings.JWT_REFRESH_SECRET_KEY,
-        algorithms=[settings.ALGORITHM]
+        algorithms=_DECODE_ALGORITHMS,
+        options=_REFRESH_DECODE_OPTIONS
     )
     
-    if payload.get("type") != "refresh":
-        raise JWTError("Invalid token type")
+    if payload["type"] != "refresh":
+        raise InvalidTokenError("Invalid token type")
     
     return payload
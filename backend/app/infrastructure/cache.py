@@ -1,20 +1,61 @@
 import os
 import redis.asyncio as redis
 import logging
+from typing import List, Optional, TypeVar, Union
+from pydantic import TypeAdapter
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
 
 class RedisClient:
     def __init__(self):
-        self.redis = redis.from_url(REDIS_URL, encoding="utf-8", decode_responses=True)
-        logger.info(f"Redis client initialized at {REDIS_URL}")
+        # One bounded pool shared by every request; keepalive + health checks
+        # avoid a reconnect storm after idle periods
+        self.pool = redis.ConnectionPool.from_url(
+            REDIS_URL,
+            encoding="utf-8",
+            decode_responses=True,
+            max_connections=50,
+            socket_keepalive=True,
+            health_check_interval=30,
+        )
+        self.redis = redis.Redis(connection_pool=self.pool)
+        logger.info("Redis client initialized at %s", REDIS_URL)
 
     async def get(self, key: str):
         return await self.redis.get(key)
 
-    async def set(self, key: str, value: str, expire: int = None):
+    async def get_list_model(self, key: str, schema: TypeAdapter) -> Optional[T]:
+        """
+        Fetch a list of JSON items and validate them as one JSON array.
+
+        Args:
+            key: Redis list key
+            schema: TypeAdapter for a list of the stored item type
+
+        Returns:
+            The validated list, or None if the key is missing or empty
+        """
+        items = await self.redis.lrange(key, 0, -1)
+        if not items:
+            return None
+        return schema.validate_json("[" + ",".join(items) + "]")
+
+    async def push_capped(self, key: str, values: List[Union[str, bytes]], max_len: int, expire: int):
+        """
+        Append to a list, keep only its last max_len items and refresh its TTL,
+        all in a single pipelined round-trip.
+        """
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.rpush(key, *values)
+            pipe.ltrim(key, -max_len, -1)
+            pipe.expire(key, expire)
+            await pipe.execute()
+
+    async def set(self, key: str, value: Union[str, bytes], expire: int = None):
         if expire:
             await self.redis.set(key, value, ex=expire)
         else:
@@ -24,7 +65,8 @@ class RedisClient:
         await self.redis.delete(key)
         
     async def close(self):
-        await self.redis.close()
+        await self.redis.aclose()
+        await self.pool.aclose()
 
 # Global instance
 redis_client = RedisClient()
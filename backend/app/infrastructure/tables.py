@@ -1,16 +1,22 @@
-from sqlalchemy import Column, String, Integer, DateTime, Date, ForeignKey, Float, Text, Boolean, and_
+from sqlalchemy import Column, String, Integer, DateTime, Date, ForeignKey, Float, Text, Boolean, Index, and_, text
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship, foreign
-import uuid
-from datetime import datetime
 from app.infrastructure.database import Base
+from app.domain.clock import utc_now
+from app.domain.ids import uuid7
+
+# Server-side default for naive UTC timestamps (same value as utc_now())
+UTC_NOW = text("timezone('utc', now())")
+# Random v4 ids generated by Postgres (built in since 13) for rows nothing needs to know
+# the id of before the INSERT; the id is read back through RETURNING on flush
+GEN_RANDOM_UUID = text("gen_random_uuid()")
 
 
 class UserModel(Base):
     """User account table."""
     __tablename__ = "users"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=GEN_RANDOM_UUID)
     email = Column(String, unique=True, nullable=False, index=True)
     hashed_password = Column(String, nullable=False)
     full_name = Column(String, nullable=True)
@@ -28,8 +34,8 @@ class UserModel(Base):
     preferences = Column(JSONB, nullable=True) # {tone, verbosity, sensitivity}
     traits = Column(JSONB, nullable=True) # {communication_style, emotional_patterns}
     
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, server_default=UTC_NOW)
+    updated_at = Column(DateTime, server_default=UTC_NOW, onupdate=utc_now)
     
     # OAuth Fields
     google_id = Column(String, unique=True, nullable=True)
@@ -46,35 +52,50 @@ class UserModel(Base):
     facts = relationship("FactModel", back_populates="user", cascade="all, delete-orphan")
     memories = relationship("EpisodicMemoryModel", back_populates="user", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_users_preferences_gin", preferences, postgresql_using="gin", postgresql_ops={"preferences": "jsonb_path_ops"}),
+        Index("ix_users_traits_gin", traits, postgresql_using="gin", postgresql_ops={"traits": "jsonb_path_ops"}),
+    )
+    # Fetch server-generated id/created_at/updated_at via INSERT ... RETURNING at
+    # flush, so a new user is fully loaded without a follow-up refresh() SELECT
+    __mapper_args__ = {"eager_defaults": True}
+
 
 class RefreshTokenModel(Base):
     """Refresh token tracking for token rotation and theft detection."""
     __tablename__ = "refresh_tokens"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=GEN_RANDOM_UUID)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     token_family = Column(String, nullable=False, index=True)
     is_revoked = Column(Boolean, default=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, server_default=UTC_NOW)
     expires_at = Column(DateTime, nullable=False)
     
     # Relationships
     user = relationship("UserModel", back_populates="refresh_tokens")
 
+    __table_args__ = (
+        # Rotation looks up (family, user); logout-all and theft response scan by user
+        Index("ix_refresh_tokens_user_family", user_id, token_family, unique=True),
+        # cleanup_expired_tokens range-deletes on expiry
+        Index("ix_refresh_tokens_expires_at", expires_at),
+    )
+
 
 class CompanionContextModel(Base):
     """User's professional well-being state."""
     __tablename__ = "companion_contexts"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=GEN_RANDOM_UUID)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), unique=True, nullable=False)
     current_mood = Column(String, nullable=True)
     current_energy = Column(Integer, default=5)
     burnout_risk_score = Column(Float, default=0.0)
     last_check_in = Column(DateTime, nullable=True)
     streak_days = Column(Integer, default=0)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, server_default=UTC_NOW)
+    updated_at = Column(DateTime, server_default=UTC_NOW, onupdate=utc_now)
 
     # Relationships
     user = relationship("UserModel", back_populates="companion_context")
@@ -90,9 +111,9 @@ class CheckInModel(Base):
     """Atomic event where user logs data about a context."""
     __tablename__ = "check_ins"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(DateTime, default=utc_now)
     
     context_type = Column(String, nullable=False) # PATIENT, COLLEAGUE, etc
     context_id = Column(String, nullable=True)
@@ -114,14 +135,19 @@ class CheckInModel(Base):
         uselist=False
     )
 
+    __table_args__ = (
+        # Recent-window reads per user; the small mood columns ride along in the leaf pages
+        Index("ix_check_ins_user_timestamp", user_id, timestamp.desc(), postgresql_include=["mood_state", "energy_level"]),
+    )
+
 
 class InsightModel(Base):
     """AI-generated reflection."""
     __tablename__ = "insights"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     target_check_in_id = Column(UUID(as_uuid=True), ForeignKey("check_ins.id", ondelete="SET NULL"), nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, server_default=UTC_NOW)
     
     type = Column(String, nullable=False)
     observation = Column(Text, nullable=False)
@@ -133,7 +159,7 @@ class PatientModel(Base):
     """Patient entity for healthcare professionals."""
     __tablename__ = "patients"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=GEN_RANDOM_UUID)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     alias = Column(String, nullable=False) # e.g. "P-101"
     emotional_load = Column(Integer, default=5) # 1-10 drain factor
@@ -147,7 +173,7 @@ class PatientModel(Base):
     notes = Column(Text, nullable=True)
     trend = Column(String, nullable=True) # 'improving', 'stable', 'declining'
     
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, server_default=UTC_NOW)
     
     # Relationships
     user = relationship("UserModel", back_populates="patients")
@@ -157,11 +183,11 @@ class ColleagueModel(Base):
     """Colleague entity for professional relationships."""
     __tablename__ = "colleagues"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=GEN_RANDOM_UUID)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     name = Column(String, nullable=False)
     relationship_type = Column(String, nullable=False) # Peer, Mentor, Supervisee
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, server_default=UTC_NOW)
     
     # Relationships
     user = relationship("UserModel", back_populates="colleagues")
@@ -171,12 +197,12 @@ class EventModel(Base):
     """Event entity for tracking significant occurrences."""
     __tablename__ = "events"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=GEN_RANDOM_UUID)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     title = Column(String, nullable=False)
     event_date = Column(DateTime, nullable=False)
     impact_level = Column(Integer, default=5)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, server_default=UTC_NOW)
     
     # Relationships
     user = relationship("UserModel", back_populates="events")
@@ -185,11 +211,11 @@ class ChatConversationModel(Base):
     """Container for persistent chat history."""
     __tablename__ = "chat_conversations"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     title = Column(String, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, server_default=UTC_NOW)
+    updated_at = Column(DateTime, server_default=UTC_NOW, onupdate=utc_now)
     
     # Context Recycling Fields
     last_summary = Column(Text, nullable=True)
@@ -204,11 +230,11 @@ class ChatMessageModel(Base):
     """Atomic message in a conversation."""
     __tablename__ = "chat_messages"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     conversation_id = Column(UUID(as_uuid=True), ForeignKey("chat_conversations.id", ondelete="CASCADE"), nullable=False)
     role = Column(String, nullable=False) # 'user' or 'assistant'
     content = Column(Text, nullable=False)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(DateTime, default=utc_now)
     
     # Relationships
     conversation = relationship("ChatConversationModel", back_populates="messages")
@@ -218,29 +244,35 @@ class FactModel(Base):
     """Structured fact about the user."""
     __tablename__ = "facts"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     
     category = Column(String, nullable=False) # preference, biographical, goal, etc.
     value = Column(Text, nullable=False)
-    confidence_score = Column(Float, default=1.0)
+    confidence_score = Column(Float, nullable=False, server_default=text("1.0"))
     
     source_message_id = Column(UUID(as_uuid=True), nullable=True)
     metadata_ = Column("metadata", JSONB, nullable=True) # avoiding reserved word clash if any, mapped to 'metadata'
     
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, nullable=False, server_default=UTC_NOW)
     last_reinforced_at = Column(DateTime, nullable=True)
-    reinforcement_count = Column(Integer, default=0)
+    reinforcement_count = Column(Integer, nullable=False, server_default=text("0"))
 
     # Relationships
     user = relationship("UserModel", back_populates="facts")
 
+    __table_args__ = (
+        Index("ix_facts_metadata_gin", metadata_, postgresql_using="gin", postgresql_ops={"metadata": "jsonb_path_ops"}),
+        Index("ix_facts_user_created", user_id, created_at.desc()),
+        Index("ix_facts_user_category", user_id, category),
+    )
+
 
 class EpisodicMemoryModel(Base):
     """Metadata for vector-stored episodic memories."""
     __tablename__ = "episodic_memories"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     
     content = Column(Text, nullable=False)
@@ -250,11 +282,19 @@ class EpisodicMemoryModel(Base):
     emotions = Column(JSONB, nullable=True) # List of strings
     topics = Column(JSONB, nullable=True) # List of strings
     
-    importance_score = Column(Float, default=0.5)
+    importance_score = Column(Float, nullable=False, server_default=text("0.5"))
     context_type = Column(String, nullable=True)
-    decay_factor = Column(Float, default=1.0)
+    decay_factor = Column(Float, nullable=False, server_default=text("1.0"))
     
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, nullable=False, server_default=UTC_NOW)
 
     # Relationships
     user = relationship("UserModel", back_populates="memories")
+
+    __table_args__ = (
+        Index("ix_episodic_memories_emotions_gin", emotions, postgresql_using="gin", postgresql_ops={"emotions": "jsonb_path_ops"}),
+        Index("ix_episodic_memories_topics_gin", topics, postgresql_using="gin", postgresql_ops={"topics": "jsonb_path_ops"}),
+        Index("ix_episodic_user_created", user_id, created_at.desc()),
+        Index("ix_episodic_session", user_id, created_at, postgresql_where=text("context_type = 'session'")),
+        Index("ix_episodic_conversation_fragment", user_id, created_at, postgresql_where=text("context_type = 'conversation_fragment'")),
+    )
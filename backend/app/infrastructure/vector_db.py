@@ -8,22 +8,42 @@ from qdrant_client.http.models import Distance, VectorParams
 
 logger = logging.getLogger(__name__)
 
+# int8 copies of the vectors stay in RAM for HNSW traversal (4x smaller than float32);
+# the originals live on disk and are only read to rescore the oversampled candidates
+QUANTIZATION_CONFIG = models.ScalarQuantization(
+    scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, always_ram=True)
+)
+QUANTIZED_SEARCH_PARAMS = models.SearchParams(
+    quantization=models.QuantizationSearchParams(rescore=True, oversampling=2.0)
+)
+
 class VectorDB:
     def __init__(self):
         self.host = os.getenv("QDRANT_HOST", "qdrant")
         self.port = int(os.getenv("QDRANT_PORT", 6333))
+        # gRPC sends vectors as packed floats instead of JSON text; REST stays available as fallback
+        self.grpc_port = int(os.getenv("QDRANT_GRPC_PORT", 6334))
+        self.prefer_grpc = os.getenv("QDRANT_PREFER_GRPC", "true").lower() == "true"
         # self.api_key = os.getenv("QDRANT_API_KEY", None) # For cloud
-        
+        # Collections confirmed to exist, so ensure_collection only hits Qdrant once per name
+        self._known_collections: set[str] = set()
+
         try:
-            self.client = QdrantClient(host=self.host, port=self.port)
-            logger.info(f"Connected to Qdrant at {self.host}:{self.port}")
+            self.client = QdrantClient(
+                host=self.host,
+                port=self.port,
+                grpc_port=self.grpc_port,
+                prefer_grpc=self.prefer_grpc,
+            )
+            transport = f"gRPC :{self.grpc_port}" if self.prefer_grpc else f"REST :{self.port}"
+            logger.info("Connected to Qdrant at %s (%s)", self.host, transport)
         except Exception as e:
-            logger.error(f"Failed to connect to Qdrant: {e}")
+            logger.error("Failed to connect to Qdrant: %s", e)
             self.client = None
 
     def ensure_collection(self, collection_name: str, vector_size: int = 1536):
         """Creates collection if it doesn't exist."""
-        if not self.client:
+        if not self.client or collection_name in self._known_collections:
             return
 
         try:
@@ -31,15 +51,25 @@ class VectorDB:
             exists = any(c.name == collection_name for c in collections.collections)
             
             if not exists:
-                logger.info(f"Creating Qdrant collection: {collection_name}")
+                logger.info("Creating Qdrant collection: %s", collection_name)
                 self.client.create_collection(
                     collection_name=collection_name,
-                    vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE)
+                    vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE, on_disk=True),
+                    quantization_config=QUANTIZATION_CONFIG
                 )
             else:
-                logger.debug(f"Collection {collection_name} already exists.")
+                logger.debug("Collection %s already exists.", collection_name)
+                # Collections created before quantization was introduced get it enabled in place
+                info = self.client.get_collection(collection_name)
+                if info.config.quantization_config is None:
+                    logger.info("Enabling int8 quantization on %s", collection_name)
+                    self.client.update_collection(
+                        collection_name=collection_name,
+                        quantization_config=QUANTIZATION_CONFIG
+                    )
+            self._known_collections.add(collection_name)
         except Exception as e:
-            logger.error(f"Error ensuring collection {collection_name}: {e}")
+            logger.error("Error ensuring collection %s: %s", collection_name, e)
 
     def upsert_vectors(self, collection_name: str, points: List[models.PointStruct]):
         if not self.client:
@@ -50,9 +80,9 @@ class VectorDB:
                 collection_name=collection_name,
                 points=points
             )
-            logger.debug(f"Upserted {len(points)} vectors to {collection_name}")
+            logger.debug("Upserted %s vectors to %s", len(points), collection_name)
         except Exception as e:
-            logger.error(f"Error upserting to {collection_name}: {e}")
+            logger.error("Error upserting to %s: %s", collection_name, e)
 
     def search(self, collection_name: str, vector: List[float], limit: int = 5, score_threshold: float = 0.7, filter_conditions: Optional[Dict] = None) -> List[models.ScoredPoint]:
         if not self.client:
@@ -79,11 +109,12 @@ class VectorDB:
                 query=vector,
                 limit=limit,
                 score_threshold=score_threshold,
-                query_filter=search_filter
+                query_filter=search_filter,
+                search_params=QUANTIZED_SEARCH_PARAMS
             ).points
             return results
         except Exception as e:
-            logger.error(f"Error searching {collection_name}: {e}")
+            logger.error("Error searching %s: %s", collection_name, e)
             return []
             
     def delete_vector(self, collection_name: str, point_id: str):
@@ -95,7 +126,7 @@ class VectorDB:
                 points_selector=models.PointIdsList(points=[point_id]),
             )
         except Exception as e:
-            logger.error(f"Error deleting vector {point_id} from {collection_name}: {e}")
+            logger.error("Error deleting vector %s from %s: %s", point_id, collection_name, e)
 
 # Global instance
 vector_db = VectorDB()
@@ -1,8 +1,12 @@
 import logging
 import sys
+from pathlib import Path
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
-from app.infrastructure.database import engine, Base
+from sqlalchemy import text
+from app.infrastructure.database import engine, Base, DBSessionMiddleware
+from app.services.llm import close_http_client
+from app.services.auth_service import close_google_http
 from app.api.routes import router as companion_router
 from app.api.auth_routes import router as auth_router
 from app.api.endpoints.analysis import router as analysis_router
@@ -15,6 +19,19 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+ALEMBIC_INI = Path(__file__).resolve().parents[1] / "alembic.ini"
+
+
+def _upgrade_to_head(connection) -> None:
+    """Apply pending Alembic migrations on an already-open connection."""
+    from alembic import command
+    from alembic.config import Config
+
+    cfg = Config(str(ALEMBIC_INI))
+    cfg.attributes["connection"] = connection
+    command.upgrade(cfg, "head")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup: Initialize DB connection
@@ -22,19 +39,29 @@ async def lifespan(app: FastAPI):
     
     # Run migrations automatically
     try:
-        import subprocess
         print("Running database migrations...")
-        # We run this in a shell to ensure 'alembic' is found in the path
+        # In-process on the app's own engine: no extra interpreter or connection setup
         # 'upgrade head' ensures the DB is at the latest version
-        subprocess.run(["alembic", "upgrade", "head"], check=True)
+        async with engine.begin() as conn:
+            await conn.run_sync(_upgrade_to_head)
         print("Migrations applied successfully.")
     except Exception as e:
         print(f"Migration error: {e}")
         # In production, you might want to exit if migrations fail
-        
+
+    # Open the first pooled connection now so the first request skips TCP/TLS/auth setup
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    except Exception as e:
+        print(f"Database warm-up failed: {e}")
+
     yield
     # Shutdown: Close connections
     print("Shutting down...")
+    await close_http_client()
+    await close_google_http()
+    await engine.dispose()
 
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -57,6 +84,8 @@ app.add_middleware(
     expose_headers=["*"]
 )
 
+app.add_middleware(DBSessionMiddleware)
+
 @app.middleware("http")
 async def add_security_headers(request, call_next):
     response = await call_next(request)
@@ -1,20 +1,43 @@
 import logging
 import json
 from uuid import UUID
-from datetime import datetime, timedelta
-from typing import Optional, List, Dict
+from datetime import timedelta
+from typing import AsyncIterator, Optional, List, Dict
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc, and_
+from sqlalchemy import select, desc, bindparam, func, literal, null, cast, union_all, Text
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 
 from app.infrastructure.tables import (
-    UserModel, CheckInModel, InsightModel, 
+    CheckInModel, InsightModel,
     PatientModel, ColleagueModel, EventModel, EpisodicMemoryModel
 )
 from app.services.llm import get_llm_provider
 from app.services.memory_service import MemoryService
+from app.domain.clock import utc_now
+from app.domain.user import User
 
 logger = logging.getLogger(__name__)
 
+ANALYSIS_FALLBACK_REPLY = "I am unable to provide a consultation at this moment due to a system error."
+
+_JSON_DECODER = json.JSONDecoder()
+
+# Anything that isn't the user (assistant, model, ...) is shown as Compy
+_ASSISTANT_TAG = "[COMPY]: "
+_HISTORY_ROLE_TAGS = {"user": "[USER]: "}
+
+# Built once; ids are bound per call so every execution reuses one compiled-cache entry
+def _or_none(col):
+    """SQL-side NULL -> 'None', matching how the prompt f-strings rendered missing values."""
+    return func.coalesce(col, "None")
+
+
+_ENTITY_STMTS = {
+    "patient": select(PatientModel).where(PatientModel.id == bindparam("eid"), PatientModel.user_id == bindparam("uid")),
+    "colleague": select(ColleagueModel).where(ColleagueModel.id == bindparam("eid"), ColleagueModel.user_id == bindparam("uid")),
+    "event": select(EventModel).where(EventModel.id == bindparam("eid"), EventModel.user_id == bindparam("uid")),
+}
+
 class AnalysisService:
     def __init__(self, db: AsyncSession):
         self.db = db
@@ -25,32 +48,46 @@ class AnalysisService:
         """Generates a daily wisdom/insight based on recent activity and memories."""
         
         # 1. Fetch recent context (last 72h check-ins + recent memories)
-        yesterday = datetime.utcnow() - timedelta(days=3)
+        # Both sets come back in one round-trip as a UNION ALL tagged by "kind"
+        yesterday = utc_now() - timedelta(days=3)
         
-        stmt_checkins = select(CheckInModel).where(
+        # Prompt lines are rendered by Postgres, so rows arrive ready to join
+        stmt_checkins = select(
+            literal("checkin").label("kind"),
+            CheckInModel.id,
+            CheckInModel.timestamp,
+            func.concat(
+                "- [", func.to_char(CheckInModel.timestamp, "HH24:MI"), "] ",
+                _or_none(CheckInModel.mood_state),
+                " (", _or_none(cast(CheckInModel.energy_level, Text)), "/10): ",
+                _or_none(CheckInModel.text_content),
+            ).label("line"),
+        ).where(
             CheckInModel.user_id == user_id,
             CheckInModel.timestamp >= yesterday
-        ).order_by(CheckInModel.timestamp.desc())
-        
-        checkins_res = await self.db.execute(stmt_checkins)
-        checkins = checkins_res.scalars().all()
+        )
         
         # Fetch generic recent memories (last 3 items created)
-        stmt_memories = select(EpisodicMemoryModel).where(
+        stmt_memories = select(
+            literal("memory").label("kind"),
+            cast(null(), PG_UUID(as_uuid=True)).label("id"),
+            EpisodicMemoryModel.created_at.label("timestamp"),
+            func.concat("- Memory: ", _or_none(EpisodicMemoryModel.summary)).label("line"),
+        ).where(
             EpisodicMemoryModel.user_id == user_id
         ).order_by(EpisodicMemoryModel.created_at.desc()).limit(3)
         
-        memories_res = await self.db.execute(stmt_memories)
-        memories = memories_res.scalars().all()
+        combined = union_all(stmt_checkins, stmt_memories.subquery().select()).subquery()
+        rows = (await self.db.execute(
+            select(combined).order_by(combined.c.kind, combined.c.timestamp.desc())
+        )).all()
         
-        if not checkins and not memories:
+        if not rows:
             return None # Not enough data
+        checkins = [r for r in rows if r.kind == "checkin"]
             
-        # 2. Prepare Data for LLM
-        checkin_summaries = [f"- [{c.timestamp.strftime('%H:%M')}] {c.mood_state} ({c.energy_level}/10): {c.text_content}" for c in checkins]
-        memory_summaries = [f"- Memory: {m.summary}" for m in memories]
-        
-        context_str = "\n".join(checkin_summaries + memory_summaries)
+        # 2. Prepare Data for LLM (check-in lines first, then memories)
+        context_str = "\n".join(r.line for r in rows)
         
         # 3. Prompting (Localized)
         from app.domain.prompts import get_insight_prompts
@@ -61,24 +98,17 @@ class AnalysisService:
         
         try:
             response_json = await self.llm.generate(system_prompt, user_prompt)
-            # Naive cleanup if LLM returns markdown blocks
-            clean_json = response_json.replace("```json", "").replace("```", "").strip()
-            
+            # Decode the first JSON object in the reply; markdown fences or
+            # chatter around it are simply skipped
+            start = response_json.find("{")
+            if start < 0:
+                logger.error("No JSON object found in response: %s", response_json)
+                raise ValueError("No JSON object in LLM response")
             try:
-                data = json.loads(clean_json)
+                data, _ = _JSON_DECODER.raw_decode(response_json, start)
             except json.JSONDecodeError:
-                # Fallback: Try to find the first { and last }
-                import re
-                match = re.search(r"\{.*\}", clean_json, re.DOTALL)
-                if match:
-                    try:
-                        data = json.loads(match.group(0))
-                    except:
-                         logger.error(f"Failed to parse inner JSON: {match.group(0)}")
-                         raise
-                else:
-                    logger.error(f"No JSON object found in response: {clean_json}")
-                    raise
+                logger.error("Failed to parse inner JSON: %s", response_json[start:])
+                raise
 
             # 4. Save Insight
             insight = InsightModel(
@@ -86,7 +116,7 @@ class AnalysisService:
                 observation=data.get("observation") or data.get("Observación", "No observation"), # Fallback for Spanish JSON keys if mixed
                 validation=data.get("validation") or data.get("Validación", "Your dedication is visible."),
                 gentle_suggestion=data.get("suggestion") or data.get("Sugerencia", "Take a moment to breathe."),
-                created_at=datetime.utcnow()
+                created_at=utc_now()
             )
             
             if checkins:
@@ -98,138 +128,134 @@ class AnalysisService:
                 return insight
                 
         except Exception as e:
-            logger.error(f"Failed to generate insight: {e} | Raw Response: {response_json if 'response_json' in locals() else 'N/A'}")
+            logger.error("Failed to generate insight: %s | Raw Response: %s", e, response_json if 'response_json' in locals() else 'N/A')
             return None
 
-    async def generate_analysis_response(self, user_id: UUID, entity_type: str, entity_id: str, message: str, history: List[Dict]) -> str:
+    async def _build_analysis_prompts(self, user: User, entity_type: str, entity_id: str, message: str, history: List[Dict]) -> tuple[Optional[str], Optional[str], Optional[str]]:
         """
-        Generates a specialist analysis response for a specific entity (Patient/Colleague/Event).
-        Acting as a clinical supervisor or specialist consultant.
+        Gathers entity context and returns (system_prompt, user_prompt, direct_reply).
+        direct_reply is set instead of the prompts when no LLM call should be made.
         """
-        try:
-            # 1. Fetch User (for profile & language)
-            user_stmt = select(UserModel).where(UserModel.id == user_id)
-            user_res = await self.db.execute(user_stmt)
-            user = user_res.scalar_one_or_none()
-            
-            if not user:
-                raise ValueError("User not found")
-            
-            language = user.language or "en"
-            user_name = user.full_name.split(' ')[0] if user.full_name else "Colleague"
-            professional_role = user.professional_role or "Mental Health Professional"
-            years_experience = user.years_experience or 0
-
-            # 2. Fetch Entity Details (Rich Context)
-            entity_name = "Unknown"
-            entity_context = ""
-            
-            # Normalize for matching
-            entity_type_norm = entity_type.lower()
-            
-            if entity_type_norm == "patient":
-                stmt = select(PatientModel).where(and_(PatientModel.id == UUID(entity_id), PatientModel.user_id == user_id))
-                res = await self.db.execute(stmt)
-                entity = res.scalar_one_or_none()
-                if entity:
-                    entity_name = entity.alias or "Patient"
-                    entity_context = (
-                        f"Patient Alias: {entity.alias}\n"
-                        f"Age: {entity.age or 'N/A'}\n"
-                        f"Emotional Load: {entity.emotional_load}/10\n"
-                        f"Clinical Notes: {entity.notes or 'None'}\n"
-                        f"Description/Summary: {entity.description or 'No description provided.'}\n"
-                        f"Status Trend: {entity.trend or 'Stable'}"
-                    )
-            
-            elif entity_type_norm == "colleague":
-                stmt = select(ColleagueModel).where(and_(ColleagueModel.id == UUID(entity_id), ColleagueModel.user_id == user_id))
-                res = await self.db.execute(stmt)
-                entity = res.scalar_one_or_none()
-                if entity:
-                    entity_name = entity.name or "Colleague"
-                    entity_context = (
-                        f"Colleague Name: {entity.name}\n"
-                        f"Relationship: {entity.relationship_type or 'Peer'}\n"
-                        f"Context: High-stakes professional interaction."
-                    )
-
-            elif entity_type_norm == "event":
-                stmt = select(EventModel).where(and_(EventModel.id == UUID(entity_id), EventModel.user_id == user_id))
-                res = await self.db.execute(stmt)
+        # 1. User profile & language come from the authenticated (cached) user
+        language = user.language or "en"
+        user_name = user.full_name.split(' ')[0] if user.full_name else "Colleague"
+        professional_role = user.professional_role or "Mental Health Professional"
+        years_experience = user.years_experience or 0
+
+        # 2. Fetch Entity Details (Rich Context)
+        entity_name = "Unknown"
+        entity_context = ""
+
+        # Normalize for matching
+        entity_type_norm = entity_type.lower()
+        entity = None
+        entity_stmt = _ENTITY_STMTS.get(entity_type_norm)
+        if entity_stmt is not None:
+            try:
+                eid = UUID(entity_id)
+            except (TypeError, ValueError):
+                # Malformed id can't match any row: skip the DB and answer "not found" below
+                eid = None
+            if eid is not None:
+                res = await self.db.execute(entity_stmt, {"eid": eid, "uid": user.id})
                 entity = res.scalar_one_or_none()
-                if entity:
-                    entity_name = entity.title or "Event"
-                    entity_context = (
-                        f"Event Title: {entity.title}\n"
-                        f"Date: {entity.event_date.strftime('%Y-%m-%d %H:%M')}\n"
-                        f"Impact Level: {entity.impact_level}/10\n"
-                        f"Context: Significant upcoming or past professional occurrence."
-                    )
-
-            # 3. Guard: If no entity found, return a specific clinical error
-            if entity_name == "Unknown":
-                error_msg = {
-                    "en": "I couldn't locate the clinical details for this specific case. Please check if the patient or event is properly registered.",
-                    "es": "No he podido localizar los detalles clínicos de este caso específico. Por favor, verifica que el paciente o evento esté registrado correctamente."
-                }
-                return error_msg.get(language, error_msg["en"])
-
-            # 3. Construct Prompts
-            from app.domain.prompts import get_analysis_prompts
-            prompts = get_analysis_prompts(language)
-            
-            # Format history for context (last 5 turns)
-            history_str = ""
-            if history:
-                turns = []
-                for m in history[-5:]:
-                    role = "USER" if m['role'] == "user" else "COMPY"
-                    turns.append(f"[{role}]: {m['content']}")
-                history_str = "\n".join(turns)
-            else:
-                history_str = "(No recent chat history for this entity)"
-
-            # System prompt only gets role-level data
-            system_prompt = prompts["system"].format(
-                user_name=user_name,
-                professional_role=professional_role,
-                years_experience=years_experience,
-                entity_name=entity_name
-            )
-            
-            # User prompt contains the heavy data for deep processing
-            if language == "es":
-                user_trigger = f"""
-# DATOS DEL CASO PARA ANÁLISIS
-{entity_context}
 
-# CONTEXTO RECIENTE (HISTORIAL DE CHAT)
-{history_str}
+        if entity_type_norm == "patient":
+            if entity:
+                entity_name = entity.alias or "Patient"
+                entity_context = (
+                    f"Patient Alias: {entity.alias}\n"
+                    f"Age: {entity.age or 'N/A'}\n"
+                    f"Emotional Load: {entity.emotional_load}/10\n"
+                    f"Clinical Notes: {entity.notes or 'None'}\n"
+                    f"Description/Summary: {entity.description or 'No description provided.'}\n"
+                    f"Status Trend: {entity.trend or 'Stable'}"
+                )
+        
+        elif entity_type_norm == "colleague":
+            if entity:
+                entity_name = entity.name or "Colleague"
+                entity_context = (
+                    f"Colleague Name: {entity.name}\n"
+                    f"Relationship: {entity.relationship_type or 'Peer'}\n"
+                    f"Context: High-stakes professional interaction."
+                )
 
-# SOLICITUD DEL PROFESIONAL
-{message or "¿Qué patrones ves en este caso y cómo debería abordarlo?"}
+        elif entity_type_norm == "event":
+            if entity:
+                entity_name = entity.title or "Event"
+                entity_context = (
+                    f"Event Title: {entity.title}\n"
+                    f"Date: {entity.event_date.strftime('%Y-%m-%d %H:%M')}\n"
+                    f"Impact Level: {entity.impact_level}/10\n"
+                    f"Context: Significant upcoming or past professional occurrence."
+                )
 
-Por favor, proporciona el ANÁLISIS CLÍNICO PROFUNDO para {entity_name} siguiendo tu rol de supervisora experta.
-"""
-            else:
-                user_trigger = f"""
-# CASE DATA FOR ANALYSIS
-{entity_context}
+        from app.domain.prompts import get_analysis_prompts
+        prompts = get_analysis_prompts(language)
 
-# RECENT CONTEXT (CHAT HISTORY)
-{history_str}
+        # 3. Guard: If no entity found, return a specific clinical error
+        if entity_name == "Unknown":
+            return None, None, prompts["not_found"]
 
-# PROFESSIONAL REQUEST
-{message or "What patterns do you see in this case and how should I handle it?"}
+        # 3. Construct Prompts
+        
+        # Format history for context (last 5 turns)
+        history_str = "\n".join(
+            _HISTORY_ROLE_TAGS.get(m['role'], _ASSISTANT_TAG) + m['content'] for m in history[-5:]
+        ) or prompts["no_history"]
+
+        # System prompt only gets role-level data
+        system_prompt = prompts["system"].format(
+            user_name=user_name,
+            professional_role=professional_role,
+            years_experience=years_experience,
+            entity_name=entity_name
+        )
+        
+        # User prompt contains the heavy data for deep processing
+        user_trigger = prompts["user"].format(
+            entity_context=entity_context,
+            history_str=history_str,
+            message=message or prompts["default_request"],
+            entity_name=entity_name
+        )
 
-Please provide the DEEP CLINICAL ANALYSIS for {entity_name} according to your specialized supervisor role.
-"""
+        return system_prompt, user_trigger, None
+
+    async def generate_analysis_response(self, user: User, entity_type: str, entity_id: str, message: str, history: List[Dict]) -> str:
+        """
+        Generates a specialist analysis response for a specific entity (Patient/Colleague/Event).
+        Acting as a clinical supervisor or specialist consultant.
+        """
+        try:
+            system_prompt, user_trigger, direct_reply = await self._build_analysis_prompts(
+                user, entity_type, entity_id, message, history
+            )
+            if direct_reply:
+                return direct_reply
 
             # 4. Generate & Response
             response = await self.llm.generate(system_prompt, user_trigger)
             return response.strip()
 
         except Exception as e:
-            logger.error(f"Error in generate_analysis_response: {e}", exc_info=True)
-            return "I am unable to provide a consultation at this moment due to a system error."
+            logger.error("Error in generate_analysis_response: %s", e, exc_info=True)
+            return ANALYSIS_FALLBACK_REPLY
+
+    async def stream_analysis_response(self, user: User, entity_type: str, entity_id: str, message: str, history: List[Dict]) -> AsyncIterator[str]:
+        """Same as generate_analysis_response, but yields the reply as the LLM produces it."""
+        try:
+            system_prompt, user_trigger, direct_reply = await self._build_analysis_prompts(
+                user, entity_type, entity_id, message, history
+            )
+            if direct_reply:
+                yield direct_reply
+                return
+
+            async for chunk in self.llm.generate_stream(system_prompt, user_trigger):
+                yield chunk
+
+        except Exception as e:
+            logger.error("Error in stream_analysis_response: %s", e, exc_info=True)
+            raise # the SSE wrapper turns this into an error event
@@ -1,16 +1,30 @@
-from datetime import datetime, timedelta
+from datetime import timedelta
 from uuid import UUID, uuid4
 from typing import Optional
+import asyncio
+import hashlib
+import secrets
+import time
+import anyio
+import httpx
+from cachetools import TLRUCache
+import jwt
+from jwt import InvalidTokenError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
+from sqlalchemy import delete, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import load_only
 from fastapi import HTTPException, status
 
+from app.domain.clock import utc_now
 from app.domain.user import User, UserCreate, UserLogin
 from app.infrastructure.tables import UserModel, RefreshTokenModel, CompanionContextModel
 from app.infrastructure.auth import (
     get_password_hash,
     verify_password,
+    password_needs_rehash,
     validate_password_strength,
+    DUMMY_PASSWORD_HASH,
     create_access_token,
     create_refresh_token,
 )
@@ -19,18 +33,52 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Columns backing the User domain model. Loading only these skips the password
+# hash and the preferences/traits JSONB blobs on the per-request auth lookup.
+USER_PROFILE_COLUMNS = tuple(getattr(UserModel, field) for field in User.model_fields)
+
+# Argon2 work gets its own thread budget: every hash holds ARGON2_MEMORY_COST
+# KiB, and a burst of logins shouldn't tie up anyio's default 40-thread pool
+# that FastAPI also uses for sync dependencies.
+_hash_limiter = anyio.CapacityLimiter(settings.PASSWORD_HASH_CONCURRENCY)
+
+
+async def _run_hasher(func, *args):
+    """Run a blocking password hash/verify call off the event loop."""
+    return await anyio.to_thread.run_sync(func, *args, limiter=_hash_limiter)
+
+
+GOOGLE_TOKENINFO_URL = "https://oauth2.googleapis.com/tokeninfo"
+
+# One pooled client so Google logins reuse a warm TLS connection
+_google_http = httpx.AsyncClient(
+    timeout=10.0,
+    limits=httpx.Limits(max_keepalive_connections=32),
+)
+
+
+async def close_google_http() -> None:
+    """Close the shared Google tokeninfo HTTP client (app shutdown)."""
+    await _google_http.aclose()
+
+# Google-verified ID token claims keyed by credential digest, each kept only
+# until the token's own "exp" (tokeninfo returns it as a string)
+_google_claims_cache: TLRUCache = TLRUCache(
+    maxsize=4096,
+    ttu=lambda _key, claims, _now: float(claims.get("exp", 0)),
+    timer=time.time,
+)
+
 
 class AuthService:
     """Service for user authentication and token management."""
     
-    def __init__(self, db: AsyncSession):
-        self.db = db
-    
-    async def register_user(self, data: UserCreate) -> tuple[User, str, str]:
+    async def register_user(self, db: AsyncSession, data: UserCreate) -> tuple[User, str, str]:
         """
         Register a new user and create their companion context.
         
         Args:
+            db: Database session
             data: User registration data
             
         Returns:
@@ -48,7 +96,7 @@ class AuthService:
             )
         
         # Check if email already exists
-        result = await self.db.execute(
+        result = await db.execute(
             select(UserModel).where(UserModel.email == data.email)
         )
         if result.scalar_one_or_none():
@@ -57,69 +105,75 @@ class AuthService:
                 detail="Email already registered"
             )
         
-        # Create user
-        hashed_password = get_password_hash(data.password)
+        # Create user (hashing is CPU-bound, keep it off the event loop)
+        hashed_password = await _run_hasher(get_password_hash, data.password)
         user_model = UserModel(
             email=data.email,
             hashed_password=hashed_password,
             full_name=data.full_name,
         )
-        self.db.add(user_model)
-        await self.db.flush()  # Get user ID
+        db.add(user_model)
+        await db.flush()  # Get user ID
         
         # Create companion context for user
         context = CompanionContextModel(user_id=user_model.id)
-        self.db.add(context)
-        
-        await self.db.commit()
-        await self.db.refresh(user_model)
+        db.add(context)
         
         # Generate tokens
-        token_family = str(uuid4())
+        token_family = uuid4().hex
         access_token = create_access_token(user_model.id)
         refresh_token = create_refresh_token(user_model.id, token_family)
         
-        # Store refresh token
-        await self._store_refresh_token(user_model.id, token_family)
-        await self.db.commit()
+        # Store refresh token; user, context and token commit together
+        await self._store_refresh_token(db, user_model.id, token_family)
+        await db.commit()
         
-        logger.info(f"Registered new user {user_model.id} with token_family {token_family}")
+        logger.info("Registered new user %s with token_family %s", user_model.id, token_family)
         
-        user = User.model_validate(user_model)
+        user = User.from_orm_trusted(user_model)
         return user, access_token, refresh_token
     
-    async def authenticate_user(self, email: str, password: str) -> Optional[User]:
+    async def authenticate_user(self, db: AsyncSession, email: str, password: str) -> Optional[User]:
         """
         Authenticate user with email and password.
         
         Args:
+            db: Database session
             email: User's email
             password: Plain text password
             
         Returns:
             User object if authenticated, None otherwise
         """
-        result = await self.db.execute(
+        result = await db.execute(
             select(UserModel).where(UserModel.email == email)
         )
         user_model = result.scalar_one_or_none()
         
         if not user_model:
+            # Burn the same verify time as a real account to avoid user enumeration
+            await _run_hasher(verify_password, password, DUMMY_PASSWORD_HASH)
             return None
         
-        if not verify_password(password, user_model.hashed_password):
+        if not await _run_hasher(verify_password, password, user_model.hashed_password):
             return None
         
         if not user_model.is_active:
             return None
         
-        return User.model_validate(user_model)
+        # Upgrade legacy bcrypt hashes (or outdated argon2 params) transparently
+        if password_needs_rehash(user_model.hashed_password):
+            user_model.hashed_password = await _run_hasher(get_password_hash, password)
+            await db.commit()
+        
+        return User.from_orm_trusted(user_model)
     
-    async def login_user(self, data: UserLogin) -> tuple[User, str, str]:
+    async def login_user(self, db: AsyncSession, data: UserLogin) -> tuple[User, str, str]:
         """
         Login user and issue tokens.
         
         Args:
+            db: Database session
             data: Login credentials
             
         Returns:
@@ -128,7 +182,7 @@ class AuthService:
         Raises:
             HTTPException: If credentials are invalid
         """
-        user = await self.authenticate_user(data.email, data.password)
+        user = await self.authenticate_user(db, data.email, data.password)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -137,23 +191,24 @@ class AuthService:
             )
         
         # Generate new token family
-        token_family = str(uuid4())
+        token_family = uuid4().hex
         access_token = create_access_token(user.id)
         refresh_token = create_refresh_token(user.id, token_family)
         
         # Store refresh token
-        await self._store_refresh_token(user.id, token_family)
-        await self.db.commit()
+        await self._store_refresh_token(db, user.id, token_family)
+        await db.commit()
         
-        logger.info(f"User {user.id} logged in with new token_family {token_family}")
+        logger.info("User %s logged in with new token_family %s", user.id, token_family)
         
         return user, access_token, refresh_token
     
-    async def refresh_access_token(self, token_family: str, user_id: UUID) -> tuple[str, str]:
+    async def refresh_access_token(self, db: AsyncSession, token_family: str, user_id: UUID) -> tuple[str, str]:
         """
         Refresh access token using refresh token rotation.
         
         Args:
+            db: Database session
             token_family: Current token family ID
             user_id: User's UUID
             
@@ -163,10 +218,46 @@ class AuthService:
         Raises:
             HTTPException: If token is revoked (theft detected) or invalid
         """
-        logger.info(f"Attempting to refresh token for user_id={user_id}, token_family={token_family}")
+        logger.info("Attempting to refresh token for user_id=%s, token_family=%s", user_id, token_family)
+        
+        # Revoke the presented token (single-use) only if it is live. The check and the
+        # revoke are one statement, so two concurrent refreshes can't both succeed.
+        now = utc_now()
+        revoked = await db.execute(
+            update(RefreshTokenModel)
+            .where(
+                RefreshTokenModel.token_family == token_family,
+                RefreshTokenModel.user_id == user_id,
+                RefreshTokenModel.is_revoked.isnot(True),
+                RefreshTokenModel.expires_at >= now
+            )
+            .values(is_revoked=True)
+            .returning(RefreshTokenModel.id)
+        )
+        if revoked.scalar_one_or_none() is None:
+            await self._reject_refresh(db, token_family, user_id)
+        
+        # Create new token family (rotation)
+        new_token_family = uuid4().hex
+        new_access_token = create_access_token(user_id)
+        new_refresh_token = create_refresh_token(user_id, new_token_family)
+        
+        # Store new refresh token
+        await self._store_refresh_token(db, user_id, new_token_family)
+        
+        await db.commit()
         
-        # Check if token family exists and is not revoked
-        result = await self.db.execute(
+        return new_access_token, new_refresh_token
+    
+    async def _reject_refresh(self, db: AsyncSession, token_family: str, user_id: UUID) -> None:
+        """
+        Work out why a refresh token could not be rotated and raise the matching 401.
+        Only runs on the failure path, so the extra lookup stays off successful refreshes.
+        
+        Raises:
+            HTTPException: Always
+        """
+        result = await db.execute(
             select(RefreshTokenModel).where(
                 RefreshTokenModel.token_family == token_family,
                 RefreshTokenModel.user_id == user_id
@@ -174,18 +265,16 @@ class AuthService:
         )
         token_record = result.scalar_one_or_none()
         
-        logger.debug(f"Database lookup result: token_record={'Found' if token_record else 'NOT FOUND'}")
+        logger.debug("Database lookup result: token_record=%s", "Found" if token_record else "NOT FOUND")
         
         if not token_record:
-            logger.error(f"Token family '{token_family}' not found in database for user {user_id}")
-            # Let's check if ANY tokens exist for this user
-            all_tokens_result = await self.db.execute(
-                select(RefreshTokenModel).where(RefreshTokenModel.user_id == user_id)
-            )
-            all_tokens = all_tokens_result.scalars().all()
-            logger.error(f"User {user_id} has {len(all_tokens)} total refresh tokens in DB")
-            for token in all_tokens:
-                logger.error(f"  - family: {token.token_family}, revoked: {token.is_revoked}, expires: {token.expires_at}")
+            logger.error("Token family '%s' not found in database for user %s", token_family, user_id)
+            # One indexed count, never a per-token dump, and only when debugging
+            if logger.isEnabledFor(logging.DEBUG):
+                token_count = await db.scalar(
+                    select(func.count()).select_from(RefreshTokenModel).where(RefreshTokenModel.user_id == user_id)
+                )
+                logger.debug("User %s has %d total refresh tokens in DB", user_id, token_count)
             
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -196,107 +285,93 @@ class AuthService:
         # THEFT DETECTION: If token is already revoked, someone is reusing it
         if token_record.is_revoked:
             # Revoke all tokens for this user (security breach)
-            await self.revoke_all_user_tokens(user_id)
+            await self.revoke_all_user_tokens(db, user_id)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Token reuse detected. All sessions have been revoked.",
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
-        # Check expiration
-        if token_record.expires_at < datetime.utcnow():
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Refresh token expired",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        
-        # Revoke old token (single-use)
-        await self.db.execute(
-            update(RefreshTokenModel)
-            .where(RefreshTokenModel.id == token_record.id)
-            .values(is_revoked=True)
+        # Not revoked, so the UPDATE skipped it for being expired
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token expired",
+            headers={"WWW-Authenticate": "Bearer"},
         )
-        
-        # Create new token family (rotation)
-        new_token_family = str(uuid4())
-        new_access_token = create_access_token(user_id)
-        new_refresh_token = create_refresh_token(user_id, new_token_family)
-        
-        # Store new refresh token
-        await self._store_refresh_token(user_id, new_token_family)
-        
-        await self.db.commit()
-        
-        return new_access_token, new_refresh_token
     
-    async def revoke_refresh_token(self, token_family: str) -> None:
+    async def revoke_refresh_token(self, db: AsyncSession, token_family: str) -> None:
         """
         Revoke a specific refresh token family.
         
         Args:
+            db: Database session
             token_family: Token family to revoke
         """
-        await self.db.execute(
+        await db.execute(
             update(RefreshTokenModel)
             .where(RefreshTokenModel.token_family == token_family)
             .values(is_revoked=True)
         )
-        await self.db.commit()
+        await db.commit()
     
-    async def revoke_all_user_tokens(self, user_id: UUID) -> None:
+    async def revoke_all_user_tokens(self, db: AsyncSession, user_id: UUID) -> None:
         """
         Revoke all refresh tokens for a user (logout all sessions).
         
         Args:
+            db: Database session
             user_id: User's UUID
         """
-        await self.db.execute(
+        await db.execute(
             update(RefreshTokenModel)
             .where(RefreshTokenModel.user_id == user_id)
             .values(is_revoked=True)
         )
-        await self.db.commit()
+        await db.commit()
     
-    async def get_user_by_id(self, user_id: UUID) -> Optional[User]:
+    async def get_user_by_id(self, db: AsyncSession, user_id: UUID) -> Optional[User]:
         """
         Get user by ID.
         
         Args:
+            db: Database session
             user_id: User's UUID
             
         Returns:
             User object or None
         """
-        result = await self.db.execute(
-            select(UserModel).where(UserModel.id == user_id)
+        result = await db.execute(
+            select(UserModel)
+            .options(load_only(*USER_PROFILE_COLUMNS))
+            .where(UserModel.id == user_id)
         )
         user_model = result.scalar_one_or_none()
         
         if not user_model:
             return None
         
-        return User.model_validate(user_model)
+        return User.from_orm_trusted(user_model)
     
-    async def _store_refresh_token(self, user_id: UUID, token_family: str) -> None:
+    async def _store_refresh_token(self, db: AsyncSession, user_id: UUID, token_family: str) -> None:
         """
         Store refresh token metadata in database.
         
         Args:
+            db: Database session
             user_id: User's UUID
             token_family: Token family ID
         """
-        expires_at = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        expires_at = utc_now() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
         
         token_record = RefreshTokenModel(
             user_id=user_id,
             token_family=token_family,
             expires_at=expires_at
         )
-        self.db.add(token_record)
-        logger.debug(f"Stored refresh token for user {user_id}, family {token_family}, expires {expires_at}")
+        db.add(token_record)
+        logger.debug("Stored refresh token for user %s, family %s, expires %s", user_id, token_family, expires_at)
     
-    async def cleanup_expired_tokens(self) -> int:
+    async def cleanup_expired_tokens(self, db: AsyncSession) -> int:
         """
         Remove expired refresh tokens from database.
         Background task for maintenance.
@@ -304,46 +379,142 @@ class AuthService:
         Returns:
             Number of tokens deleted
         """
-        result = await self.db.execute(
-            select(RefreshTokenModel).where(
-                RefreshTokenModel.expires_at < datetime.utcnow()
+        # One set-based DELETE on the expires_at index; nothing is loaded into the session
+        result = await db.execute(
+            delete(RefreshTokenModel)
+            .where(RefreshTokenModel.expires_at < utc_now())
+            .execution_options(synchronize_session=False)
+        )
+        
+        await db.commit()
+        return result.rowcount
+
+    async def _verify_google_credential(self, credential: str) -> dict:
+        """
+        Verify a Google ID token against Google's tokeninfo endpoint.
+        
+        Args:
+            credential: JWT ID token from Google
+            
+        Returns:
+            Verified token claims
+            
+        Raises:
+            HTTPException: If Google rejects the token
+        """
+        key = hashlib.blake2b(credential.encode(), digest_size=16).digest()
+        claims = _google_claims_cache.get(key)
+        if claims is not None:
+            return claims
+        
+        try:
+            resp = await _google_http.get(GOOGLE_TOKENINFO_URL, params={"id_token": credential})
+            resp.raise_for_status()
+            claims = resp.json()
+        except Exception as e:
+            logger.error("Google Token Verification Failed: %s", e)
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid Google credentials"
             )
+        
+        _google_claims_cache[key] = claims
+        return claims
+    
+    async def _find_google_user(self, db: AsyncSession, google_id: Optional[str], email: Optional[str]) -> Optional[UserModel]:
+        """
+        Find a user by Google ID or email.
+        
+        Args:
+            db: Database session
+            google_id: Google account subject ID
+            email: Google account email
+            
+        Returns:
+            Matching UserModel or None
+        """
+        # Only match on the identifiers we have: "google_id == None" would
+        # compile to IS NULL and match every password-only account
+        conditions = []
+        if google_id:
+            conditions.append(UserModel.google_id == google_id)
+        if email:
+            conditions.append(UserModel.email == email)
+        if not conditions:
+            return None
+        
+        result = await db.execute(select(UserModel).where(or_(*conditions)))
+        return result.scalar_one_or_none()
+
+    async def _create_google_user(self, db: AsyncSession, google_id: str, email: str, name: str) -> Optional[UserModel]:
+        """
+        Insert a new Google user and their companion context (not committed).
+        
+        ON CONFLICT DO NOTHING makes concurrent first logins for the same
+        account safe: the loser gets no row back and uses the winner's.
+        
+        Args:
+            db: Database session
+            google_id: Verified Google account subject ID
+            email: Verified Google account email
+            name: Display name from Google
+            
+        Returns:
+            The new (or concurrently created) UserModel
+        """
+        # Generate a random strong password (user won't use it, but DB needs it)
+        random_pw = secrets.token_hex(32)
+        hashed_password = await _run_hasher(get_password_hash, random_pw)
+        
+        result = await db.execute(
+            pg_insert(UserModel)
+            .values(
+                email=email,
+                hashed_password=hashed_password,
+                full_name=name,
+                google_id=google_id,
+                auth_provider="google",
+                is_active=True
+            )
+            .on_conflict_do_nothing()
+            .returning(UserModel)
         )
-        expired_tokens = result.scalars().all()
+        user_model = result.scalar_one_or_none()
         
-        for token in expired_tokens:
-            await self.db.delete(token)
+        if user_model is None:
+            return await self._find_google_user(db, google_id, email)
         
-        await self.db.commit()
-        return len(expired_tokens)
+        # Create context
+        db.add(CompanionContextModel(user_id=user_model.id))
+        return user_model
 
-    async def register_or_login_google_user(self, credential: str) -> tuple[User, str, str]:
+    async def register_or_login_google_user(self, db: AsyncSession, credential: str) -> tuple[User, str, str]:
         """
         Authenticate user via Google OAuth 2.0.
         
         Args:
+            db: Database session
             credential: JWT ID token from Google
             
         Returns:
             Tuple of (user, access_token, refresh_token)
         """
-        import httpx
-        
-        # 1. Verify Token with Google
-        async with httpx.AsyncClient() as client:
-            try:
-                resp = await client.get(
-                    f"https://oauth2.googleapis.com/tokeninfo?id_token={credential}",
-                    timeout=10.0
-                )
-                resp.raise_for_status()
-                google_data = resp.json()
-            except Exception as e:
-                logger.error(f"Google Token Verification Failed: {e}")
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Invalid Google credentials"
-                )
+        # 1. Verify Token with Google while provisionally looking up the user
+        # from the (not yet verified) token claims
+        try:
+            hint = jwt.decode(credential, options={"verify_signature": False})
+        except InvalidTokenError:
+            hint = {}
+        
+        google_data, user_model = await asyncio.gather(
+            self._verify_google_credential(credential),
+            self._find_google_user(db, hint.get("sub"), hint.get("email")),
+            return_exceptions=True
+        )
+        if isinstance(google_data, BaseException):
+            raise google_data
+        if isinstance(user_model, BaseException):
+            raise user_model
         
         # 2. Check Audience (Client ID)
         if google_data.get("aud") != settings.GOOGLE_CLIENT_ID:
@@ -356,52 +527,29 @@ class AuthService:
         email = google_data["email"]
         name = google_data.get("name", "Google User")
         
-        # 3. Find User (by google_id OR email)
-        result = await self.db.execute(
-            select(UserModel).where(
-                (UserModel.google_id == google_id) | (UserModel.email == email)
-            )
-        )
-        user_model = result.scalar_one_or_none()
+        # 3. Find User (by google_id OR email) - only trust the provisional
+        # lookup if it was made with the claims Google just verified
+        if hint.get("sub") != google_id or hint.get("email") != email:
+            user_model = await self._find_google_user(db, google_id, email)
         
-        if user_model:
-            # Update google_id if missing (Link account)
-            if not user_model.google_id:
-                user_model.google_id = google_id
-                user_model.auth_provider = "google" # Switch or add marker
-                self.db.add(user_model)
-                await self.db.commit()
-                await self.db.refresh(user_model)
-        else:
-            # Create new user
-            # Generate a random strong password (user won't use it, but DB needs it)
-            random_pw = str(uuid4()) + str(uuid4())
-            hashed_password = get_password_hash(random_pw)
-            
-            user_model = UserModel(
-                email=email,
-                hashed_password=hashed_password,
-                full_name=name,
-                google_id=google_id,
-                auth_provider="google",
-                is_active=True
-            )
-            self.db.add(user_model)
-            await self.db.flush()
-            
-            # Create context
-            context = CompanionContextModel(user_id=user_model.id)
-            self.db.add(context)
-            
-            await self.db.commit()
-            await self.db.refresh(user_model)
+        if user_model is None:
+            user_model = await self._create_google_user(db, google_id, email, name)
+        
+        if not user_model.google_id:
+            # Link account; flushed with the refresh token below
+            user_model.google_id = google_id
+            user_model.auth_provider = "google" # Switch or add marker
             
         # 4. Generate Tokens
-        token_family = str(uuid4())
+        token_family = uuid4().hex
         access_token = create_access_token(user_model.id)
         refresh_token = create_refresh_token(user_model.id, token_family)
         
-        await self._store_refresh_token(user_model.id, token_family)
-        await self.db.commit()
+        await self._store_refresh_token(db, user_model.id, token_family)
+        await db.commit()
         
-        return User.model_validate(user_model), access_token, refresh_token
+        return User.from_orm_trusted(user_model), access_token, refresh_token
+
+
+# Stateless singleton; the request session is passed into each call
+auth_service = AuthService()
@@ -1,3 +1,4 @@
+from typing import List
 from uuid import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
@@ -5,27 +6,39 @@ from app.infrastructure.tables import CompanionContextModel, CheckInModel
 from app.domain.models import CheckInIntent, MoodState, CheckIn as CheckInSchema
 from datetime import datetime
 
-class CompanionService:
-    def __init__(self, db: AsyncSession):
-        self.db = db
+# Column order for COPY into check_ins; _check_in_copy_record builds tuples in this order
+_CHECK_IN_COPY_COLUMNS = (
+    "id", "user_id", "timestamp", "context_type", "context_id",
+    "intent", "mood_state", "energy_level", "text_content",
+)
+
 
-    async def get_or_create_context(self, user_id: UUID) -> CompanionContextModel:
+def _check_in_copy_record(c: CheckInSchema) -> tuple:
+    return (
+        c.id, c.user_id, c.timestamp, c.context_type, c.context_id,
+        c.intent.value,
+        c.mood_state.value if c.mood_state else None,
+        c.energy_level, c.text_content,
+    )
+
+class CompanionService:
+    async def get_or_create_context(self, db: AsyncSession, user_id: UUID) -> CompanionContextModel:
         """
         Retrieves the user's longitudinal context or creates a fresh one.
         """
         stmt = select(CompanionContextModel).where(CompanionContextModel.user_id == user_id)
-        result = await self.db.execute(stmt)
+        result = await db.execute(stmt)
         context = result.scalar_one_or_none()
         
         if not context:
             context = CompanionContextModel(user_id=user_id)
-            self.db.add(context)
-            await self.db.commit()
-            await self.db.refresh(context)
+            db.add(context)
+            await db.commit()
+            await db.refresh(context)
             
         return context
 
-    async def record_check_in(self, check_in_data: CheckInSchema) -> CheckInModel:
+    async def record_check_in(self, db: AsyncSession, check_in_data: CheckInSchema) -> CheckInModel:
         """
         Records a check-in and updates the context (simple logic for now).
         """
@@ -40,11 +53,11 @@ class CompanionService:
             energy_level=check_in_data.energy_level,
             text_content=check_in_data.text_content
         )
-        self.db.add(db_check_in)
+        db.add(db_check_in)
         
         # 2. Update Context (Simple Logic for MVP)
         # In a real system, this would be more complex or async
-        context = await self.get_or_create_context(check_in_data.user_id)
+        context = await self.get_or_create_context(db, check_in_data.user_id)
         
         if check_in_data.energy_level:
             # Simple moving average or just set current? Let's just set current for now.
@@ -57,6 +70,32 @@ class CompanionService:
         # Naive streak logic placeholder
         # context.streak_days += 1 
         
-        await self.db.commit()
-        await self.db.refresh(db_check_in)
+        await db.commit()
+        await db.refresh(db_check_in)
         return db_check_in
+
+    async def record_check_ins_bulk(self, db: AsyncSession, check_ins: List[CheckInSchema]) -> int:
+        """
+        Inserts many check-ins with a single COPY (imports/backfills).
+
+        Bypasses the ORM entirely: one round-trip, no per-row model objects.
+        Unlike record_check_in it does not update the companion context.
+        Ids and timestamps come from the CheckIn defaults (UUIDv7 / utc_now).
+        """
+        if not check_ins:
+            return 0
+
+        records = [_check_in_copy_record(c) for c in check_ins]
+
+        connection = await db.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            CheckInModel.__tablename__,
+            records=records,
+            columns=_CHECK_IN_COPY_COLUMNS,
+        )
+        await db.commit()
+        return len(records)
+
+
+companion_service = CompanionService()
@@ -1,8 +1,15 @@
+import asyncio
 from uuid import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func, tuple_
+from app.infrastructure.database import in_own_session
 from app.infrastructure.tables import PatientModel, EventModel, CheckInModel
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
+
+
+async def _fetch_all(session: AsyncSession, stmt):
+    return (await session.scalars(stmt)).all()
+
 
 class ContextHydrator:
     """
@@ -14,25 +21,24 @@ class ContextHydrator:
 
     async def get_global_context(self, user_id: UUID) -> Dict[str, Any]:
         """Gathers overall state: patients, events, and last 10 global check-ins."""
-        # 1. Fetch Patients (Limited summary)
+        # 1. Patients (limited summary)
         p_stmt = select(PatientModel).where(PatientModel.user_id == user_id)
-        p_res = await self.db.execute(p_stmt)
-        patients = p_res.scalars().all()
-        
-        # 2. Fetch Events (Next 7 days or top 5)
+        # 2. Events (top 5 by date)
         e_stmt = select(EventModel).where(EventModel.user_id == user_id).order_by(EventModel.event_date.asc()).limit(5)
-        e_res = await self.db.execute(e_stmt)
-        events = e_res.scalars().all()
-        
-        # 3. Last 10 Global Check-ins
+        # 3. Last 10 global check-ins
         c_stmt = (
             select(CheckInModel)
             .where(CheckInModel.user_id == user_id)
             .order_by(CheckInModel.timestamp.desc())
             .limit(10)
         )
-        c_res = await self.db.execute(c_stmt)
-        check_ins = c_res.scalars().all()
+
+        # Independent reads: one short-lived session each so they run concurrently
+        patients, events, check_ins = await asyncio.gather(
+            in_own_session(_fetch_all, p_stmt),
+            in_own_session(_fetch_all, e_stmt),
+            in_own_session(_fetch_all, c_stmt),
+        )
         
         return {
             "patients": [{"alias": p.alias, "load": p.emotional_load, "trend": p.trend} for p in patients],
@@ -50,20 +56,63 @@ class ContextHydrator:
 
     async def get_entity_context(self, user_id: UUID, entity_type: str, entity_id: str) -> Dict[str, Any]:
         """Gathers focused context for one Patient or Colleague (last 10 check-ins)."""
-        # 1. Fetch entity-specific check-ins
+        contexts = await self.get_entity_contexts_bulk(user_id, [(entity_type, entity_id)])
+        return contexts[0]
+
+    async def get_entity_contexts_bulk(self, user_id: UUID, entities: List[Tuple[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Gathers the last 10 check-ins for each (entity_type, entity_id) in one query.
+
+        Returns one context per requested entity, in the same order.
+        """
+        if not entities:
+            return []
+
+        # check_ins.context_id is a string column, while callers often hold
+        # patient ids as UUIDs: key both the filter and the lookup by str
+        keys = [(entity_type, str(entity_id)) for entity_type, entity_id in entities]
+
+        # Rank each entity's check-ins newest-first and keep the top 10 per
+        # partition, instead of one LIMIT 10 query per entity
+        rn = func.row_number().over(
+            partition_by=(CheckInModel.context_type, CheckInModel.context_id),
+            order_by=CheckInModel.timestamp.desc(),
+        ).label("rn")
+        ranked = (
+            select(
+                CheckInModel.context_type,
+                CheckInModel.context_id,
+                CheckInModel.mood_state,
+                CheckInModel.energy_level,
+                CheckInModel.text_content,
+                CheckInModel.timestamp,
+                rn,
+            )
+            .where(
+                CheckInModel.user_id == user_id,
+                tuple_(CheckInModel.context_type, CheckInModel.context_id).in_(list(dict.fromkeys(keys))),
+            )
+            .subquery()
+        )
         stmt = (
-            select(CheckInModel)
-            .where(CheckInModel.user_id == user_id, CheckInModel.context_type == entity_type, CheckInModel.context_id == entity_id)
-            .order_by(CheckInModel.timestamp.desc())
-            .limit(10)
+            select(ranked)
+            .where(ranked.c.rn <= 10)
+            .order_by(ranked.c.context_type, ranked.c.context_id, ranked.c.rn)
         )
         res = await self.db.execute(stmt)
-        logs = res.scalars().all()
-        
-        return {
-            "entity": {"type": entity_type, "id": entity_id},
-            "history": [
-                {"mood": l.mood_state, "energy": l.energy_level, "note": l.text_content, "date": l.timestamp.isoformat()} 
-                for l in logs
-            ]
-        }
+
+        histories: Dict[Tuple[str, str], List[Dict[str, Any]]] = {key: [] for key in keys}
+        for l in res:
+            history = histories.get((l.context_type, l.context_id))
+            if history is not None:
+                history.append(
+                    {"mood": l.mood_state, "energy": l.energy_level, "note": l.text_content, "date": l.timestamp.isoformat()}
+                )
+
+        return [
+            {
+                "entity": {"type": entity_type, "id": entity_id},
+                "history": histories[key],
+            }
+            for (entity_type, entity_id), key in zip(entities, keys)
+        ]
@@ -1,20 +1,87 @@
+import asyncio
 import re
+import hashlib
 import logging
 from uuid import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.infrastructure.tables import CompanionContextModel, CheckInModel, InsightModel, UserModel
+from app.infrastructure.cache import redis_client
+from app.infrastructure.database import in_own_session
 from app.services.llm import get_llm_provider
 from app.domain.prompts import get_insight_prompts
 from app.domain.models import InsightType
 
 logger = logging.getLogger(__name__)
 
+INSIGHT_LLM_CACHE_TTL = 900 # 15 minutes: identical prompts (e.g. refreshes) reuse the last response
+
+# Section headers of an insight response, matched in one scan.
+# Pattern Explanation:
+# ^[ \t#>*\-]*(?:\d+[.)][ \t]*)? -> Header at a line start, after optional markdown/list markers ("**", "#", "-", "1.")
+# (...) -> English or Spanish field name, accented or not
+# \**\s*:\s*\** -> Colon (optionally inside markdown bolding) and whitespace
+_SECTION_NAMES = r'\**(Observaci[oó]n|Observation|Validaci[oó]n|Validation|Sugerencia|Suggestion)[ \t]*\**[ \t]*:[ \t]*\**\s*'
+_SECTION_RE = re.compile(r'(?im)^[ \t#>*\-]*(?:\d+[.)][ \t]*)?' + _SECTION_NAMES)
+# Fallback for replies that put every field on one line ("Observation: ... .
+# Suggestion: ..."): a header may also start a new sentence, i.e. follow
+# sentence punctuation and whitespace - never just any whitespace, so
+# "your need for validation: ..." mid-sentence is not a header.
+_INLINE_SECTION_RE = re.compile(r'(?i)(?:\A[ \t#>*\-]*|(?<=[.!?;])\s+)' + _SECTION_NAMES)
+_SECTION_KEYS = {"observ": "observation", "valida": "validation", "sugere": "suggestion", "sugges": "suggestion"}
+
+
+def _split_sections(text: str, pattern: re.Pattern) -> dict:
+    sections = {}
+    matches = list(pattern.finditer(text))
+    for i, match in enumerate(matches):
+        key = _SECTION_KEYS[match.group(1)[:6].lower()]
+        if key not in sections:
+            end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+            sections[key] = text[match.end():end].strip()
+    return sections
+
+
+def _parse_insight_sections(text: str) -> dict:
+    """
+    Split an insight response into its sections by header offsets.
+
+    Each section runs from the end of its header to the start of the next
+    one. Only the first occurrence of each section is kept. Line-start
+    headers are authoritative; the sentence-start fallback is only used
+    when it recovers more sections (one-line replies).
+    """
+    sections = _split_sections(text, _SECTION_RE)
+    if len(sections) < len(set(_SECTION_KEYS.values())):
+        inline = _split_sections(text, _INLINE_SECTION_RE)
+        if len(inline) > len(sections):
+            return inline
+    return sections
+
 class InsightService:
     def __init__(self, db: AsyncSession):
         self.db = db
         self.llm = get_llm_provider()
 
+    async def _generate_cached(self, user_id: UUID, system_prompt: str, user_prompt: str) -> str:
+        """LLM call memoized in Redis per user and exact prompt pair (e.g. dashboard refreshes)."""
+        digest = hashlib.blake2b(f"{system_prompt}\x00{user_prompt}".encode(), digest_size=16).hexdigest()
+        key = f"insight:llm:{user_id}:{digest}"
+        try:
+            cached = await redis_client.get(key)
+            if cached is not None:
+                return cached
+        except Exception as e:
+            logger.warning("Redis unavailable for insight cache get: %s", e)
+
+        response_text = await self.llm.generate(system_prompt, user_prompt)
+
+        try:
+            await redis_client.set(key, response_text, expire=INSIGHT_LLM_CACHE_TTL)
+        except Exception as e:
+            logger.warning("Redis unavailable for insight cache set: %s", e)
+        return response_text
+
     async def generate_daily_insight(self, user_id: UUID, context_type: str = None, context_id: str = None, context_name: str = None) -> InsightModel:
         # 1. Fetch User (for profile & language)
         user_stmt = select(UserModel).where(UserModel.id == user_id)
@@ -22,11 +89,19 @@ class InsightService:
         user = user_res.scalar_one_or_none()
         
         if not user:
-            logger.error(f"User {user_id} not found for insight generation")
+            logger.error("User %s not found for insight generation", user_id)
             return None
 
         # 2. Fetch Context & Recent Check-Ins (Last 5 for context)
-        stmt = select(CheckInModel).where(CheckInModel.user_id == user_id)
+        # Plain rows with just the columns the prompt and target id need; no ORM hydration
+        stmt = select(
+            CheckInModel.id,
+            CheckInModel.timestamp,
+            CheckInModel.intent,
+            CheckInModel.mood_state,
+            CheckInModel.energy_level,
+            CheckInModel.text_content,
+        ).where(CheckInModel.user_id == user_id)
         
         if context_type and context_id:
             stmt = stmt.where(CheckInModel.context_type == context_type, CheckInModel.context_id == str(context_id))
@@ -34,16 +109,18 @@ class InsightService:
         stmt = stmt.order_by(CheckInModel.timestamp.desc()).limit(5)
         
         result = await self.db.execute(stmt)
-        check_ins = result.scalars().all()
+        check_ins = result.all()
 
         # --- Context Fetching (Entity awareness) ---
-        from app.services.entity_service import EntityService
-        entity_service = EntityService(self.db)
+        from app.services.entity_service import entity_service
         
         active_context_summary = ""
         if not context_id:
-            patients = await entity_service.list_patients(user_id)
-            events = await entity_service.list_events(user_id)
+            # Independent reads, each on its own short-lived session so they overlap
+            patients, events = await asyncio.gather(
+                in_own_session(entity_service.list_patients, user_id),
+                in_own_session(entity_service.list_events, user_id),
+            )
             
             p_text = ", ".join([f"{p.alias} (Load: {p.emotional_load})" for p in patients[:5]])
             e_text = ", ".join([f"{e.title} (Impact: {e.impact_level})" for e in events[:3]])
@@ -101,12 +178,12 @@ class InsightService:
         """
 
         # 4. Call LLM
-        logger.info(f"Generating Daily Insight. System prompt length: {len(system_instructions)}. User prompt length: {len(user_prompt)}")
+        logger.info("Generating Daily Insight. System prompt length: %s. User prompt length: %s", len(system_instructions), len(user_prompt))
         
-        response_text = await self.llm.generate(system_instructions, user_prompt)
+        response_text = await self._generate_cached(user_id, system_instructions, user_prompt)
         
-        logger.info(f"Daily Insight AI Response received. Length: {len(response_text)}")
-        logger.debug(f"AI RESPONSE CONTENT: {response_text}")
+        logger.info("Daily Insight AI Response received. Length: %s", len(response_text))
+        logger.debug("AI RESPONSE CONTENT: %s", response_text)
 
         # 4. Parse Response (Simple Regex/Splitting)
         # Expected format:
@@ -118,29 +195,16 @@ class InsightService:
         validation = "You are doing your best."
         suggestion = None
 
-        # 4. Parse Response (Resilient Regex)
+        # 4. Parse Response (Resilient Regex, single pass over the section headers)
         # Expected keys (case-insensitive, supports markdown bolding and variations)
         # English: Observation, Validation, Suggestion
         # Spanish: Observación, Validación, Sugerencia
         
         try:
-            # Pattern Explanation:
-            # (?:...) -> Non-capturing group for the prefix
-            # \** ... \** -> Optional markdown bolding
-            # [ÓóOoaá...] -> Support for accented and non-accented variants
-            # \s*:\s* -> Colon with optional surrounding whitespace
-            # (.*?) -> Capture the content until the next field or end of string
-            
-            obs_match = re.search(r'(?i)(?:\**Observaci[oó]n|\**Observation)\s*:\s*(.*?)(?=\n(?:\**Valid|Validaci[oó]n|Suggestion|Sugerencia)|$)', response_text, re.DOTALL)
-            val_match = re.search(r'(?i)(?:\**Validaci[oó]n|\**Validation)\s*:\s*(.*?)(?=\n(?:\**Sug|Sugerencia|Suggestion)|$)', response_text, re.DOTALL)
-            sug_match = re.search(r'(?i)(?:\**Sugerencia|\**Suggestion)\s*:\s*(.*)', response_text, re.DOTALL)
-
-            if obs_match:
-                observation = obs_match.group(1).strip()
-            if val_match:
-                validation = val_match.group(1).strip()
-            if sug_match:
-                suggestion = sug_match.group(1).strip()
+            sections = _parse_insight_sections(response_text)
+            observation = sections.get("observation", observation)
+            validation = sections.get("validation", validation)
+            suggestion = sections.get("suggestion")
 
             # Handle multi-line suggestion if it captured extra stuff
             if suggestion:
@@ -149,7 +213,7 @@ class InsightService:
                 suggestion = suggestion.strip()
 
         except Exception as e:
-            logger.error(f"Error parsing LLM response with regex: {e}")
+            logger.error("Error parsing LLM response with regex: %s", e)
             observation = response_text # Fallback
 
         # 5. Save Insight
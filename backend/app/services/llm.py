@@ -1,20 +1,44 @@
 from abc import ABC, abstractmethod
 import os
+import orjson
 import httpx
-from typing import Optional
-from google import genai
-from google.genai import types
+import numpy as np
+from typing import TYPE_CHECKING, AsyncIterator, Optional
 from dotenv import load_dotenv
 
+if TYPE_CHECKING:
+    from google.genai import types
+
 # Load environment variables from .env file
 load_dotenv()
 
+# One pooled client for the OpenRouter calls, so each generate/embedding
+# request reuses a warm TLS connection instead of a fresh handshake
+_http_client = httpx.AsyncClient(
+    limits=httpx.Limits(max_keepalive_connections=20, max_connections=50),
+)
+
+
+def _dummy_embedding(dim: int) -> list[float]:
+    """Random placeholder vector for when no embedding API is available."""
+    # One vectorized fill instead of a Python loop over random.random()
+    return np.random.random_sample(dim).tolist()
+
+
+async def close_http_client() -> None:
+    """Close the shared LLM HTTP client (app shutdown)."""
+    await _http_client.aclose()
+
 class LLMProvider(ABC):
     @abstractmethod
     async def generate(self, system_prompt: str, user_prompt: str, max_tokens: int = 4000) -> str:
         """Generates text from the LLM."""
         pass
 
+    async def generate_stream(self, system_prompt: str, user_prompt: str, max_tokens: int = 4000) -> AsyncIterator[str]:
+        """Streams text chunks from the LLM. Defaults to a single chunk."""
+        yield await self.generate(system_prompt, user_prompt, max_tokens)
+
     @abstractmethod
     async def get_embedding(self, text: str) -> list[float]:
         """Generates a vector embedding for the text."""
@@ -36,9 +60,8 @@ class MockLLMProvider(LLMProvider):
         return "Hello, I am The Mirror. How can I help you today?"
 
     async def get_embedding(self, text: str) -> list[float]:
-        import random
         # Return 1536-dim dummy vector
-        return [random.random() for _ in range(1536)]
+        return _dummy_embedding(1536)
 
 class OpenRouterLLMProvider(LLMProvider):
     def __init__(self, api_key: str, model: str = "mistralai/mistral-7b-instruct"):
@@ -47,14 +70,15 @@ class OpenRouterLLMProvider(LLMProvider):
         self.base_url = "https://openrouter.ai/api/v1/chat/completions"
         self.embedding_url = "https://openrouter.ai/api/v1/embeddings"
 
-    async def generate(self, system_prompt: str, user_prompt: str, max_tokens: int = 4000) -> str:
-        headers = {
+    def _headers(self) -> dict:
+        return {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
             "HTTP-Referer": "http://localhost:5173", # Required by OpenRouter for free tier/stats
         }
-        
-        payload = {
+
+    def _chat_payload(self, system_prompt: str, user_prompt: str, max_tokens: int) -> dict:
+        return {
             "model": self.model,
             "messages": [
                 {"role": "system", "content": system_prompt},
@@ -65,17 +89,40 @@ class OpenRouterLLMProvider(LLMProvider):
             "stop": ["User:", "\nUser:", "Assistant:", "\nAssistant:"] # Prevent turn simulation only
         }
 
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(self.base_url, headers=headers, json=payload, timeout=30.0)
-                if response.status_code != 200:
-                    print(f"ERROR: OpenRouter returned {response.status_code}: {response.text}")
-                response.raise_for_status()
-                data = response.json()
-                return data["choices"][0]["message"]["content"]
-            except Exception as e:
-                print(f"CRITICAL ERROR in OpenRouterLLMProvider: {e}")
-                raise e
+    async def generate(self, system_prompt: str, user_prompt: str, max_tokens: int = 4000) -> str:
+        headers = self._headers()
+        payload = self._chat_payload(system_prompt, user_prompt, max_tokens)
+
+        try:
+            response = await _http_client.post(self.base_url, headers=headers, content=orjson.dumps(payload), timeout=30.0)
+            if response.status_code != 200:
+                print(f"ERROR: OpenRouter returned {response.status_code}: {response.text}")
+            response.raise_for_status()
+            data = orjson.loads(response.content)
+            return data["choices"][0]["message"]["content"]
+        except Exception as e:
+            print(f"CRITICAL ERROR in OpenRouterLLMProvider: {e}")
+            raise e
+
+    async def generate_stream(self, system_prompt: str, user_prompt: str, max_tokens: int = 4000) -> AsyncIterator[str]:
+        """Streams completion deltas from OpenRouter's SSE endpoint."""
+        payload = self._chat_payload(system_prompt, user_prompt, max_tokens)
+        payload["stream"] = True
+
+        async with _http_client.stream("POST", self.base_url, headers=self._headers(), content=orjson.dumps(payload), timeout=30.0) as response:
+            if response.status_code != 200:
+                body = await response.aread()
+                print(f"ERROR: OpenRouter stream returned {response.status_code}: {body.decode(errors='replace')}")
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue # SSE comments / keep-alives
+                data = line[6:]
+                if data == "[DONE]":
+                    break
+                delta = orjson.loads(data)["choices"][0]["delta"].get("content")
+                if delta:
+                    yield delta
 
     async def get_embedding(self, text: str) -> list[float]:
         headers = {
@@ -92,21 +139,18 @@ class OpenRouterLLMProvider(LLMProvider):
             "input": text
         }
 
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(self.embedding_url, headers=headers, json=payload, timeout=10.0)
-                if response.status_code != 200:
-                    # Fallback to dummy if API fails (e.g. model not supported on this route)
-                    print(f"WARNING: Embedding API failed {response.status_code}, using dummy.")
-                    import random
-                    return [random.random() for _ in range(1536)]
+        try:
+            response = await _http_client.post(self.embedding_url, headers=headers, content=orjson.dumps(payload), timeout=10.0)
+            if response.status_code != 200:
+                # Fallback to dummy if API fails (e.g. model not supported on this route)
+                print(f"WARNING: Embedding API failed {response.status_code}, using dummy.")
+                return _dummy_embedding(1536)
                     
-                data = response.json()
-                return data["data"][0]["embedding"]
-            except Exception as e:
-                print(f"ERROR generating embedding: {e}")
-                import random
-                return [random.random() for _ in range(1536)]
+            data = orjson.loads(response.content)
+            return data["data"][0]["embedding"]
+        except Exception as e:
+            print(f"ERROR generating embedding: {e}")
+            return _dummy_embedding(1536)
 
 class GoogleDirectLLMProvider(LLMProvider):
     """
@@ -114,6 +158,9 @@ class GoogleDirectLLMProvider(LLMProvider):
     Maximum context: 1M tokens, superior performance.
     """
     def __init__(self, api_key: str):
+        # The SDK (and its large types module) is only imported when this provider is chosen
+        from google import genai
+
         self.api_key = api_key
         self.client = genai.Client(api_key=api_key)
         # Using gemini-2.5-flash (latest stable, 1M context)
@@ -125,33 +172,11 @@ class GoogleDirectLLMProvider(LLMProvider):
         Uses system_instruction for proper separation of system/user context.
         """
         try:
-            # Create prompt with system instruction
-            response = self.client.models.generate_content(
+            # Create prompt with system instruction (async API: the request doesn't block the event loop)
+            response = await self.client.aio.models.generate_content(
                 model=self.model_id,
                 contents=user_prompt,
-                config=types.GenerateContentConfig(
-                    system_instruction=system_prompt,
-                    temperature=0.4,
-                    max_output_tokens=max_tokens,
-                    safety_settings=[
-                        types.SafetySetting(
-                            category='HARM_CATEGORY_HARASSMENT',
-                            threshold='BLOCK_NONE'
-                        ),
-                        types.SafetySetting(
-                            category='HARM_CATEGORY_HATE_SPEECH',
-                            threshold='BLOCK_NONE'
-                        ),
-                        types.SafetySetting(
-                            category='HARM_CATEGORY_SEXUALLY_EXPLICIT',
-                            threshold='BLOCK_NONE'
-                        ),
-                        types.SafetySetting(
-                            category='HARM_CATEGORY_DANGEROUS_CONTENT',
-                            threshold='BLOCK_NONE'
-                        ),
-                    ]
-                )
+                config=self._generate_config(system_prompt, max_tokens)
             )
             
             return response.text
@@ -159,22 +184,59 @@ class GoogleDirectLLMProvider(LLMProvider):
         except Exception as e:
             print(f"ERROR in GoogleDirectLLMProvider: {e}")
             raise e
+
+    async def generate_stream(self, system_prompt: str, user_prompt: str, max_tokens: int = 4000) -> AsyncIterator[str]:
+        """Streams response chunks using the SDK's async streaming API."""
+        stream = await self.client.aio.models.generate_content_stream(
+            model=self.model_id,
+            contents=user_prompt,
+            config=self._generate_config(system_prompt, max_tokens)
+        )
+        async for chunk in stream:
+            if chunk.text:
+                yield chunk.text
+
+    def _generate_config(self, system_prompt: str, max_tokens: int) -> "types.GenerateContentConfig":
+        from google.genai import types
+
+        return types.GenerateContentConfig(
+            system_instruction=system_prompt,
+            temperature=0.4,
+            max_output_tokens=max_tokens,
+            safety_settings=[
+                types.SafetySetting(
+                    category='HARM_CATEGORY_HARASSMENT',
+                    threshold='BLOCK_NONE'
+                ),
+                types.SafetySetting(
+                    category='HARM_CATEGORY_HATE_SPEECH',
+                    threshold='BLOCK_NONE'
+                ),
+                types.SafetySetting(
+                    category='HARM_CATEGORY_SEXUALLY_EXPLICIT',
+                    threshold='BLOCK_NONE'
+                ),
+                types.SafetySetting(
+                    category='HARM_CATEGORY_DANGEROUS_CONTENT',
+                    threshold='BLOCK_NONE'
+                ),
+            ]
+        )
     
     async def get_embedding(self, text: str) -> list[float]:
         """
         Generate embeddings using Google's embedding model.
         """
         try:
-            result = self.client.models.embed_content(
+            result = await self.client.aio.models.embed_content(
                 model="text-embedding-004",
-                content=text
+                contents=text
             )
             return result.embeddings[0].values
         except Exception as e:
             print(f"ERROR generating embedding with Google: {e}")
             # Fallback to dummy
-            import random
-            return [random.random() for _ in range(768)]
+            return _dummy_embedding(768)
 
 class GeminiLLMProvider(OpenRouterLLMProvider):
     """
@@ -185,14 +247,8 @@ class GeminiLLMProvider(OpenRouterLLMProvider):
         super().__init__(api_key=api_key, model="google/gemini-2.0-flash-thinking-exp-01-21") 
         self.model = "google/gemini-2.0-flash-thinking-exp-01-21"
 
-    async def generate(self, system_prompt: str, user_prompt: str, max_tokens: int = 4000) -> str:
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-            "HTTP-Referer": "http://localhost:5173",
-        }
-        
-        payload = {
+    def _chat_payload(self, system_prompt: str, user_prompt: str, max_tokens: int) -> dict:
+        return {
             "model": self.model,
             "messages": [
                 {"role": "system", "content": system_prompt},
@@ -202,17 +258,20 @@ class GeminiLLMProvider(OpenRouterLLMProvider):
             "max_tokens": max_tokens,
         }
 
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(self.base_url, headers=headers, json=payload, timeout=30.0)
-                if response.status_code != 200:
-                    print(f"ERROR: OpenRouter (Gemini) returned {response.status_code}: {response.text}")
-                response.raise_for_status()
-                data = response.json()
-                return data["choices"][0]["message"]["content"]
-            except Exception as e:
-                print(f"CRITICAL ERROR in GeminiLLMProvider (OpenRouter): {e}")
-                raise e
+    async def generate(self, system_prompt: str, user_prompt: str, max_tokens: int = 4000) -> str:
+        headers = self._headers()
+        payload = self._chat_payload(system_prompt, user_prompt, max_tokens)
+
+        try:
+            response = await _http_client.post(self.base_url, headers=headers, content=orjson.dumps(payload), timeout=30.0)
+            if response.status_code != 200:
+                print(f"ERROR: OpenRouter (Gemini) returned {response.status_code}: {response.text}")
+            response.raise_for_status()
+            data = orjson.loads(response.content)
+            return data["choices"][0]["message"]["content"]
+        except Exception as e:
+            print(f"CRITICAL ERROR in GeminiLLMProvider (OpenRouter): {e}")
+            raise e
 
 def get_llm_provider() -> LLMProvider:
     """Factory to get the configured provider with fallback chain."""
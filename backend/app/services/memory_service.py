@@ -2,54 +2,61 @@ import logging
 import json
 from typing import List, Optional, Dict
 from uuid import UUID
-from datetime import datetime
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc
-from app.infrastructure.tables import FactModel, EpisodicMemoryModel, UserModel
+from sqlalchemy import select, desc, func, true
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from app.infrastructure.tables import FactModel, EpisodicMemoryModel, UserModel, ChatConversationModel, ChatMessageModel
 from app.infrastructure.cache import redis_client
 from app.infrastructure.vector_db import vector_db
-from app.domain.memory_models import FactCreate, EpisodicMemoryCreate
+from app.domain.clock import utc_now
+from app.domain.memory_models import FactCreate, EpisodicMemoryCreate, StmTurn
+from app.domain.models import ChatConversationSoA
+from pydantic import TypeAdapter
 
 logger = logging.getLogger(__name__)
 
 STM_TTL = 3600 * 4 # 4 hours for short term context
+STM_MAX_TURNS = 20
+_stm_adapter = TypeAdapter(List[StmTurn])
+_stm_turn_adapter = TypeAdapter(StmTurn)
+
+
+def _stm_key(user_id: UUID) -> str:
+    # Redis list, one JSON turn per item (the older "stm:{id}" keys were a single JSON string)
+    return f"stm:list:{user_id}"
 
 class MemoryService:
     def __init__(self, db: AsyncSession):
         self.db = db
 
     # --- Short Term Memory (STM) ---
-    async def get_stm_context(self, user_id: UUID) -> List[Dict]:
+    async def get_stm_context(self, user_id: UUID) -> List[StmTurn]:
         """Retrieves recent conversation window from Redis."""
-        key = f"stm:{user_id}"
         try:
-            data = await redis_client.get(key)
+            data = await redis_client.get_list_model(_stm_key(user_id), _stm_adapter)
             if data:
-                return json.loads(data)
+                return data
         except Exception as e:
-            logger.warning(f"Redis unavailable for STM get: {e}")
+            logger.warning("Redis unavailable for STM get: %s", e)
         return []
 
     async def append_stm_message(self, user_id: UUID, role: str, content: str):
         """Appends a message to the sliding window STM."""
+        await self.append_stm_messages(user_id, [(role, content)])
+
+    async def append_stm_messages(self, user_id: UUID, messages: List[tuple]):
+        """Appends (role, content) messages to the sliding window STM in one round-trip."""
         try:
-            key = f"stm:{user_id}"
-            current = await self.get_stm_context(user_id)
-            
-            current.append({
-                "role": role,
-                "content": content,
-                "timestamp": datetime.utcnow().isoformat()
-            })
-            
+            timestamp = utc_now()
+            turns = [
+                _stm_turn_adapter.dump_json({"role": role, "content": content, "timestamp": timestamp})
+                for role, content in messages
+            ]
             # Keep last 20 messages only
-            if len(current) > 20:
-                current = current[-20:]
-                
-            await redis_client.set(key, json.dumps(current), expire=STM_TTL)
+            await redis_client.push_capped(_stm_key(user_id), turns, STM_MAX_TURNS, STM_TTL)
         except Exception as e:
-            logger.warning(f"Redis unavailable for STM set: {e}")
+            logger.warning("Redis unavailable for STM set: %s", e)
 
     # --- Long Term Memory (Facts) ---
     async def add_fact(self, user_id: UUID, fact_data: FactCreate) -> FactModel:
@@ -67,7 +74,7 @@ class MemoryService:
         if fact:
             # Reinforce existing fact
             fact.reinforcement_count += 1
-            fact.last_reinforced_at = datetime.utcnow()
+            fact.last_reinforced_at = utc_now()
             fact.metadata_ = fact_data.metadata # Update metadata
             await self.db.commit()
             await self.db.refresh(fact)
@@ -171,6 +178,60 @@ class MemoryService:
                 
         return ordered
     # --- Background Processing ---
+    async def load_conversation_soa(self, conversation_id: UUID, last_n: Optional[int] = None) -> Optional[ChatConversationSoA]:
+        """
+        Load a conversation's messages as parallel columns in one row.
+
+        The database aggregates the (last_n most recent) messages with
+        array_agg, so no per-message ORM objects are built.
+
+        Args:
+            conversation_id: Conversation UUID
+            last_n: Only include the most recent N messages (all if None)
+
+        Returns:
+            ChatConversationSoA with messages oldest first, or None if the conversation doesn't exist
+        """
+        recent = (
+            select(ChatMessageModel.id, ChatMessageModel.role, ChatMessageModel.content, ChatMessageModel.timestamp)
+            .where(ChatMessageModel.conversation_id == conversation_id)
+            .order_by(ChatMessageModel.timestamp.desc())
+            .limit(last_n)
+            .subquery()
+        )
+
+        def column(col):
+            # FILTER drops the NULL row produced by the outer join when there are no messages
+            return func.array_agg(aggregate_order_by(col, recent.c.timestamp.asc())).filter(recent.c.id.isnot(None))
+
+        stmt = (
+            select(
+                ChatConversationModel.id,
+                ChatConversationModel.user_id,
+                column(recent.c.id),
+                column(recent.c.role),
+                column(recent.c.content),
+                column(recent.c.timestamp),
+            )
+            .select_from(ChatConversationModel)
+            .outerjoin(recent, true())
+            .where(ChatConversationModel.id == conversation_id)
+            .group_by(ChatConversationModel.id, ChatConversationModel.user_id)
+        )
+        row = (await self.db.execute(stmt)).one_or_none()
+        if row is None:
+            return None
+
+        conv_id, user_id, message_ids, roles, contents, timestamps = row
+        return ChatConversationSoA.model_construct(
+            conversation_id=conv_id,
+            user_id=user_id,
+            message_ids=message_ids or [],
+            roles=roles or [],
+            contents=contents or [],
+            timestamps=timestamps or [],
+        )
+
     async def process_conversation_background(self, conversation_id: UUID) -> Dict[str, int]:
         """
         'Subconscious' processing:
@@ -179,28 +240,23 @@ class MemoryService:
         3. Persist to LTM (Facts & Vector)
         4. Clean up STM if needed (optional)
         """
-        from app.infrastructure.tables import ChatConversationModel
         from app.services.llm import get_llm_provider
         
         llm = get_llm_provider()
         
         # 1. Fetch Conversation
-        stmt = select(ChatConversationModel).where(ChatConversationModel.id == conversation_id)
-        res = await self.db.execute(stmt)
-        conv = res.scalar_one_or_none()
+        # Ideally we process only new messages since last processing, but for MVP we process the "session"
+        # Assuming we trigger this after a "session" ends or periodically.
+        # For simplicity, let's take the last 20 messages.
+        conv = await self.load_conversation_soa(conversation_id, last_n=20)
         
         if not conv:
             return {"status": "error", "message": "Conversation not found"}
             
-        # Get messages
-        # Ideally we process only new messages since last processing, but for MVP we process the "session"
-        # Assuming we trigger this after a "session" ends or periodically.
-        # For simplicity, let's take the last 20 messages.
-        msgs = conv.messages[-20:] 
-        if not msgs:
+        if not conv.roles:
              return {"status": "skipped", "message": "No messages"}
              
-        transcript = "\n".join([f"{m.role}: {m.content}" for m in msgs])
+        transcript = "\n".join([f"{role}: {content}" for role, content in zip(conv.roles, conv.contents)])
         
         # 2. LLM Extraction
         system_prompt = """
@@ -254,5 +310,5 @@ class MemoryService:
             return {"status": "success", "stats": stats}
             
         except Exception as e:
-            logger.error(f"Error in background processing: {e}")
+            logger.error("Error in background processing: %s", e)
             return {"status": "error", "message": str(e)}
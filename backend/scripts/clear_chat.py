@@ -7,6 +7,7 @@ sys.path.append(os.getcwd())
 
 from app.infrastructure.database import AsyncSessionLocal
 from app.infrastructure.cache import redis_client
+from app.services.memory_service import _stm_key
 from app.infrastructure.tables import ChatConversationModel, ChatMessageModel, UserModel
 from sqlalchemy import delete, select
 
@@ -19,8 +20,9 @@ async def clear_all_chats():
             user_ids = res.scalars().all()
             
             for uid in user_ids:
-                key = f"stm:{uid}"
-                await redis_client.delete(key)
+                # Current list key, plus the single-string key older versions wrote
+                for key in (_stm_key(uid), f"stm:{uid}"):
+                    await redis_client.delete(key)
                 print(f"  - Cleared Redis STM for user {uid}")
             
             # 2. Delete all chat messages
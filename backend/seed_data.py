@@ -1,12 +1,13 @@
 import asyncio
 import os
 import subprocess
-from datetime import datetime, timedelta
+from datetime import timedelta
 from uuid import uuid4
 from sqlalchemy import text, select
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from app.infrastructure.tables import Base, UserModel, CompanionContextModel, PatientModel, ColleagueModel, EventModel, CheckInModel
 from app.infrastructure.auth import get_password_hash
+from app.domain.clock import utc_now
 from app.domain.models import CheckInIntent, MoodState
 
 # Configuration
@@ -111,32 +112,32 @@ async def seed_data(reset=False):
             PatientModel(
                 user_id=user.id, alias="Leo (P-202)", emotional_load=10, trend="declining",
                 description="TEA Grado 3. Crisis de agresividad graves dirigidas al personal. Inestabilidad sensorial extrema.",
-                therapy_start_date=datetime.utcnow().date() - timedelta(days=60)
+                therapy_start_date=utc_now().date() - timedelta(days=60)
             ),
             PatientModel(
                 user_id=user.id, alias="Sofía (P-203)", emotional_load=9, trend="stable",
                 description="Depresión mayor infantil precoz. Ideación suicida activa. Historial de autolesiones constantes.",
-                therapy_start_date=datetime.utcnow().date() - timedelta(days=30)
+                therapy_start_date=utc_now().date() - timedelta(days=30)
             ),
             PatientModel(
                 user_id=user.id, alias="Marc (P-204)", emotional_load=8, trend="declining",
                 description="Trastorno disocial de la conducta. Oposicionismo extremo y fugas del hospital de día.",
-                therapy_start_date=datetime.utcnow().date() - timedelta(days=90)
+                therapy_start_date=utc_now().date() - timedelta(days=90)
             ),
             PatientModel(
                 user_id=user.id, alias="Lucía (P-205)", emotional_load=9, trend="declining",
                 description="Brote psicótico en evolución. Alucinaciones auditivas y desorganización en el grupo de terapia.",
-                therapy_start_date=datetime.utcnow().date() - timedelta(days=15)
+                therapy_start_date=utc_now().date() - timedelta(days=15)
             ),
             PatientModel(
                 user_id=user.id, alias="Hugo (P-206)", emotional_load=7, trend="improving",
                 description="Mutismo selectivo tras trauma familiar complejo. Empieza a emitir sonidos, pero muy vulnerable.",
-                therapy_start_date=datetime.utcnow().date() - timedelta(days=120)
+                therapy_start_date=utc_now().date() - timedelta(days=120)
             ),
             PatientModel(
                 user_id=user.id, alias="Elena (P-207)", emotional_load=10, trend="declining",
                 description="TCA restrictivo grave. Rechazo absoluto a la comida en sala. Riesgo inminente de ingreso hospitalario total.",
-                therapy_start_date=datetime.utcnow().date() - timedelta(days=10)
+                therapy_start_date=utc_now().date() - timedelta(days=10)
             ),
         ]
         db.add_all(patients)
@@ -156,11 +157,11 @@ async def seed_data(reset=False):
         # 5. Stressful Life & Work Events
         print("Adding High-Impact Events...")
         events = [
-            EventModel(user_id=user.id, title="Auditoría de Acreditación Sanitaria", event_date=datetime.utcnow() + timedelta(days=7), impact_level=10),
-            EventModel(user_id=user.id, title="Presentación de Resultados a Dirección", event_date=datetime.utcnow() + timedelta(days=2), impact_level=9),
-            EventModel(user_id=user.id, title="Crisis Familiar (Problema de salud grave)", event_date=datetime.utcnow() + timedelta(days=5), impact_level=10),
-            EventModel(user_id=user.id, title="Reunión de Equipo Conflictiva (Vanesa)", event_date=datetime.utcnow() + timedelta(days=1), impact_level=8),
-            EventModel(user_id=user.id, title="Supervisión Externa Individual", event_date=datetime.utcnow() + timedelta(days=14), impact_level=6),
+            EventModel(user_id=user.id, title="Auditoría de Acreditación Sanitaria", event_date=utc_now() + timedelta(days=7), impact_level=10),
+            EventModel(user_id=user.id, title="Presentación de Resultados a Dirección", event_date=utc_now() + timedelta(days=2), impact_level=9),
+            EventModel(user_id=user.id, title="Crisis Familiar (Problema de salud grave)", event_date=utc_now() + timedelta(days=5), impact_level=10),
+            EventModel(user_id=user.id, title="Reunión de Equipo Conflictiva (Vanesa)", event_date=utc_now() + timedelta(days=1), impact_level=8),
+            EventModel(user_id=user.id, title="Supervisión Externa Individual", event_date=utc_now() + timedelta(days=14), impact_level=6),
         ]
         db.add_all(events)
         await db.flush()
@@ -180,7 +181,7 @@ async def seed_data(reset=False):
         ]
 
         for i, entry in enumerate(history_history):
-            ts = datetime.utcnow() - timedelta(days=(9-i), hours=4)
+            ts = utc_now() - timedelta(days=(9-i), hours=4)
             db.add(CheckInModel(
                 user_id=user.id,
                 timestamp=ts,
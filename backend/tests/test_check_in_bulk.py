@@ -0,0 +1,145 @@
+import asyncio
+import unittest
+import uuid
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+from app.api.dependencies import get_current_user
+from app.api.routes import MAX_BULK_CHECK_INS
+from app.domain.models import CheckIn, CheckInIntent, MoodState
+from app.infrastructure.database import get_db
+from app.infrastructure.tables import CheckInModel
+from app.main import app
+from app.services.companion_service import _CHECK_IN_COPY_COLUMNS, _check_in_copy_record, companion_service
+
+
+class _FakeDriverConnection:
+    def __init__(self):
+        self.copies = []
+
+    async def copy_records_to_table(self, table, records, columns):
+        self.copies.append((table, list(records), columns))
+
+
+class _FakeSession:
+    """Just enough AsyncSession surface for the COPY path."""
+
+    def __init__(self):
+        self.driver = _FakeDriverConnection()
+        self.commits = 0
+
+    async def connection(self):
+        return self
+
+    async def get_raw_connection(self):
+        return self
+
+    @property
+    def driver_connection(self):
+        return self.driver
+
+    async def commit(self):
+        self.commits += 1
+
+
+def _check_in(**overrides) -> CheckIn:
+    fields = dict(
+        user_id=uuid.uuid4(),
+        timestamp=datetime(2026, 10, 14, 9, 30),
+        context_type="PATIENT",
+        context_id="p-1",
+        intent=CheckInIntent.TRACK,
+        mood_state=MoodState.DRAINED,
+        energy_level=3,
+        text_content="Long session",
+    )
+    fields.update(overrides)
+    return CheckIn(**fields)
+
+
+class CheckInCopyMappingTest(unittest.TestCase):
+    def test_columns_cover_the_check_ins_table(self):
+        self.assertEqual(set(_CHECK_IN_COPY_COLUMNS), set(CheckInModel.__table__.columns.keys()))
+        self.assertEqual(len(_CHECK_IN_COPY_COLUMNS), len(set(_CHECK_IN_COPY_COLUMNS)))
+
+    def test_record_values_line_up_with_columns(self):
+        c = _check_in()
+        row = dict(zip(_CHECK_IN_COPY_COLUMNS, _check_in_copy_record(c), strict=True))
+        self.assertEqual(row, {
+            "id": c.id,
+            "user_id": c.user_id,
+            "timestamp": c.timestamp,
+            "context_type": "PATIENT",
+            "context_id": "p-1",
+            "intent": CheckInIntent.TRACK.value,
+            "mood_state": MoodState.DRAINED.value,
+            "energy_level": 3,
+            "text_content": "Long session",
+        })
+
+    def test_optional_enums_map_to_null(self):
+        row = dict(zip(_CHECK_IN_COPY_COLUMNS, _check_in_copy_record(_check_in(mood_state=None))))
+        self.assertIsNone(row["mood_state"])
+
+
+class RecordCheckInsBulkTest(unittest.TestCase):
+    def test_single_copy_then_commit(self):
+        session = _FakeSession()
+        check_ins = [_check_in(), _check_in(context_id="p-2")]
+        inserted = asyncio.run(companion_service.record_check_ins_bulk(session, check_ins))
+
+        self.assertEqual(inserted, 2)
+        self.assertEqual(session.commits, 1)
+        (table, records, columns), = session.driver.copies
+        self.assertEqual(table, "check_ins")
+        self.assertEqual(columns, _CHECK_IN_COPY_COLUMNS)
+        self.assertEqual(records, [_check_in_copy_record(c) for c in check_ins])
+
+    def test_empty_batch_skips_copy(self):
+        session = _FakeSession()
+        self.assertEqual(asyncio.run(companion_service.record_check_ins_bulk(session, [])), 0)
+        self.assertEqual(session.driver.copies, [])
+
+
+class ImportCheckInsEndpointTest(unittest.TestCase):
+    def setUp(self):
+        self.session = _FakeSession()
+        self.user = type("AuthUser", (), {"id": uuid.uuid4()})()
+        app.dependency_overrides[get_db] = lambda: self.session
+        app.dependency_overrides[get_current_user] = lambda: self.user
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        app.dependency_overrides.clear()
+
+    def test_imports_for_the_authenticated_user(self):
+        payload = [
+            {"context_type": "SELF", "intent": "RELEASE", "mood_state": "ANXIOUS", "energy_level": 4},
+            {"context_type": "PATIENT", "context_id": "p-9", "intent": "TRACK"},
+        ]
+        response = self.client.post("/companion/check-ins/bulk", json=payload)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"inserted": 2})
+        (_, records, _), = self.session.driver.copies
+        rows = [dict(zip(_CHECK_IN_COPY_COLUMNS, r)) for r in records]
+        self.assertEqual({r["user_id"] for r in rows}, {self.user.id})
+        self.assertEqual([r["context_id"] for r in rows], [None, "p-9"])
+        self.assertEqual(rows[0]["mood_state"], "ANXIOUS")
+        self.assertEqual(len({r["id"] for r in rows}), 2)
+
+    def test_rejects_invalid_items(self):
+        response = self.client.post("/companion/check-ins/bulk", json=[{"context_type": "SELF", "intent": "RELEASE", "energy_level": 11}])
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(self.session.driver.copies, [])
+
+    def test_rejects_oversized_batches(self):
+        payload = [{"context_type": "SELF", "intent": "TRACK"}] * (MAX_BULK_CHECK_INS + 1)
+        response = self.client.post("/companion/check-ins/bulk", json=payload)
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(self.session.driver.copies, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
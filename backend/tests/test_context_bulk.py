@@ -0,0 +1,84 @@
+import asyncio
+import unittest
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.infrastructure.tables import CheckInModel
+from app.services.context_service import ContextHydrator
+
+
+class _AsyncSessionAdapter:
+    """Runs the hydrator's awaited execute() on a sync SQLite session."""
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    async def execute(self, stmt):
+        return self.session.execute(stmt)
+
+
+class EntityContextsBulkTest(unittest.TestCase):
+    def setUp(self):
+        # SQLite stand-in for the check_ins table: plain columns, no FK to users
+        self.engine = create_engine("sqlite://")
+        columns = ", ".join(c.name for c in CheckInModel.__table__.columns if c.name != "id")
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql(f"CREATE TABLE check_ins (id CHAR(32) PRIMARY KEY, {columns})")
+
+        self.user_id = uuid.uuid4()
+        self.patient_id = uuid.uuid4()
+        start = datetime(2026, 10, 1, 9, 0)
+        rows = [
+            dict(user_id=self.user_id, timestamp=start + timedelta(days=i), context_type="PATIENT",
+                 context_id=str(self.patient_id), intent="TRACK", mood_state=None, energy_level=i % 10,
+                 text_content=f"p{i}")
+            for i in range(12)
+        ]
+        rows.append(dict(user_id=self.user_id, timestamp=start, context_type="COLLEAGUE",
+                         context_id="c-1", intent="RELEASE", mood_state="DRAINED", energy_level=None,
+                         text_content="c0"))
+        # Same entity, other user: must not leak into this user's context
+        rows.append(dict(user_id=uuid.uuid4(), timestamp=start, context_type="PATIENT",
+                         context_id=str(self.patient_id), intent="TRACK", mood_state=None, energy_level=None,
+                         text_content="other"))
+        with self.engine.begin() as conn:
+            conn.execute(CheckInModel.__table__.insert(), [dict(id=uuid.uuid4(), **r) for r in rows])
+
+        self.session = Session(self.engine)
+        self.hydrator = ContextHydrator(_AsyncSessionAdapter(self.session))
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def _bulk(self, entities):
+        return asyncio.run(self.hydrator.get_entity_contexts_bulk(self.user_id, entities))
+
+    def test_uuid_entity_ids_match_string_context_ids(self):
+        contexts = self._bulk([("PATIENT", self.patient_id), ("COLLEAGUE", "c-1")])
+
+        self.assertEqual(contexts[0]["entity"], {"type": "PATIENT", "id": self.patient_id})
+        self.assertEqual([h["note"] for h in contexts[0]["history"]], [f"p{i}" for i in range(11, 1, -1)])
+        self.assertEqual(contexts[1]["history"], [
+            {"mood": "DRAINED", "energy": None, "note": "c0", "date": "2026-10-01T09:00:00"},
+        ])
+
+    def test_keeps_request_order_and_empty_histories(self):
+        contexts = self._bulk([("COLLEAGUE", "nobody"), ("COLLEAGUE", "c-1"), ("PATIENT", str(self.patient_id))])
+
+        self.assertEqual([c["entity"]["id"] for c in contexts], ["nobody", "c-1", str(self.patient_id)])
+        self.assertEqual([len(c["history"]) for c in contexts], [0, 1, 10])
+
+    def test_single_entity_delegates_to_bulk(self):
+        context = asyncio.run(self.hydrator.get_entity_context(self.user_id, "COLLEAGUE", "c-1"))
+        self.assertEqual([h["note"] for h in context["history"]], ["c0"])
+
+    def test_no_entities(self):
+        self.assertEqual(self._bulk([]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,28 @@
+import time
+import unittest
+
+from app.domain.ids import uuid7
+
+
+class Uuid7Test(unittest.TestCase):
+    def test_version_and_variant(self):
+        value = uuid7()
+        self.assertEqual(value.version, 7)
+        self.assertEqual(value.variant, "specified in RFC 4122")
+
+    def test_timestamp_prefix_is_unix_ms(self):
+        before = time.time_ns() // 1_000_000
+        value = uuid7()
+        after = time.time_ns() // 1_000_000
+        self.assertTrue(before <= value.int >> 80 <= after)
+
+    def test_unique_and_time_ordered_across_milliseconds(self):
+        first = uuid7()
+        time.sleep(0.002)
+        second = uuid7()
+        self.assertLess(first, second)
+        self.assertEqual(len({uuid7() for _ in range(10_000)}), 10_000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import asyncio
+import unittest
+
+from app.services.insight_service import _parse_insight_sections
+from app.services.llm import MockLLMProvider
+
+
+class ParseInsightSectionsTest(unittest.TestCase):
+    def test_mock_english_reply_on_one_line(self):
+        reply = asyncio.run(MockLLMProvider().generate("Observation: ...", ""))
+        sections = _parse_insight_sections(reply)
+        self.assertEqual(sections["observation"], "I noticed you are checking in frequently. This shows commitment.")
+        self.assertEqual(sections["suggestion"], "Keep it up.")
+        self.assertNotIn("validation", sections)
+
+    def test_mock_spanish_reply_on_one_line(self):
+        reply = asyncio.run(MockLLMProvider().generate("Responde ÚNICAMENTE en Español. Observación: ...", ""))
+        sections = _parse_insight_sections(reply)
+        self.assertEqual(sections["observation"], "He notado registros frecuentes.")
+        self.assertEqual(sections["suggestion"], "Continúa así.")
+
+    def test_multiline_markdown_reply(self):
+        reply = (
+            "Here is your briefing:\n"
+            "**Observación:** Mucha carga\nde trabajo esta semana.\n"
+            "**Validación**: Es normal sentirse así.\n"
+            "3. Sugerencia: Respira antes de cada sesión.\n\nÁnimo."
+        )
+        sections = _parse_insight_sections(reply)
+        self.assertEqual(sections["observation"], "Mucha carga\nde trabajo esta semana.")
+        self.assertEqual(sections["validation"], "Es normal sentirse así.")
+        self.assertEqual(sections["suggestion"], "Respira antes de cada sesión.\n\nÁnimo.")
+
+    def test_header_word_mid_sentence_is_not_a_header(self):
+        reply = (
+            "Observación: Semana intensa. Tu necesidad de validación: es normal.\n"
+            "Validación: Es válido sentirse así.\n"
+            "Sugerencia: Descansa entre sesiones."
+        )
+        sections = _parse_insight_sections(reply)
+        self.assertEqual(sections["observation"], "Semana intensa. Tu necesidad de validación: es normal.")
+        self.assertEqual(sections["validation"], "Es válido sentirse así.")
+        self.assertEqual(sections["suggestion"], "Descansa entre sesiones.")
+
+    def test_one_line_header_needs_sentence_punctuation(self):
+        sections = _parse_insight_sections("Observation: You seek validation: often. Suggestion: Rest.")
+        self.assertEqual(sections, {"observation": "You seek validation: often.", "suggestion": "Rest."})
+
+    def test_first_occurrence_wins(self):
+        sections = _parse_insight_sections("Observation: first.\nObservation: second.")
+        self.assertEqual(sections["observation"], "first.")
+
+    def test_no_headers(self):
+        self.assertEqual(_parse_insight_sections("Hello, I am The Mirror."), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
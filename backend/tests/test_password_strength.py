@@ -0,0 +1,46 @@
+import random
+import string
+import unittest
+
+from app.infrastructure.auth import validate_password_strength
+
+
+def _reference_validate(password: str):
+    """The original any()-based checks, kept as the behaviour to match."""
+    if len(password) < 8:
+        return False, "Password must be at least 8 characters long"
+    if not any(c.isupper() for c in password):
+        return False, "Password must contain at least one uppercase letter"
+    if not any(c.islower() for c in password):
+        return False, "Password must contain at least one lowercase letter"
+    if not any(c.isdigit() for c in password):
+        return False, "Password must contain at least one number"
+    return True, None
+
+
+# ASCII plus Unicode letters/digits the regex fast path doesn't cover
+_ALPHABET = string.ascii_letters + string.digits + string.punctuation + " ÁÉÑáéñßΩω٣३ﬁ"
+
+
+class ValidatePasswordStrengthTest(unittest.TestCase):
+    def test_messages(self):
+        self.assertEqual(validate_password_strength("Ab1"), (False, "Password must be at least 8 characters long"))
+        self.assertEqual(validate_password_strength("abcdefg1"), (False, "Password must contain at least one uppercase letter"))
+        self.assertEqual(validate_password_strength("ABCDEFG1"), (False, "Password must contain at least one lowercase letter"))
+        self.assertEqual(validate_password_strength("Abcdefgh"), (False, "Password must contain at least one number"))
+        self.assertEqual(validate_password_strength("Abcdefg1"), (True, None))
+
+    def test_unicode_classes_count(self):
+        # Non-ASCII upper/lower/digit characters satisfy the rules, as with str.isupper etc.
+        self.assertEqual(validate_password_strength("Ñandú٣xx"), (True, None))
+        self.assertEqual(validate_password_strength("ÁÉÑ1234x"), (True, None))
+
+    def test_matches_reference_on_random_inputs(self):
+        rng = random.Random(1234)
+        for _ in range(5000):
+            password = "".join(rng.choice(_ALPHABET) for _ in range(rng.randint(0, 16)))
+            self.assertEqual(validate_password_strength(password), _reference_validate(password), password)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+
+from app.domain.prompts import PROMPTS, _get_lang_key, render_chat_system_prompt
+
+
+def _reference_lang_key(language):
+    """The original prefix check, kept as the behaviour to match."""
+    if not language:
+        return "en"
+    return "es" if language.lower().startswith("es") else "en"
+
+
+class GetLangKeyTest(unittest.TestCase):
+    def test_known_codes(self):
+        for language, expected in [("en", "en"), ("en-US", "en"), ("es", "es"), ("es-ES", "es"), ("ES_mx", "es")]:
+            self.assertEqual(_get_lang_key(language), expected, language)
+
+    def test_unknown_and_empty_fall_back_to_english(self):
+        for language in ["", None, "e", "fr", "pt-BR", "xx-es"]:
+            self.assertEqual(_get_lang_key(language), "en", language)
+
+    def test_matches_reference(self):
+        for language in ["", "e", "E", "es", "Es", "eS-419", "en", "en-GB", "esperanto", "fr-CA", "de", " es"]:
+            self.assertEqual(_get_lang_key(language), _reference_lang_key(language), language)
+        self.assertEqual(set(PROMPTS), {"en", "es"})
+
+
+_CHAT_FIELDS = {
+    "today_date": "2026-10-14",
+    "user_name": "Ana",
+    "professional_role": "Therapist",
+    "years_experience": "8",
+    "primary_stressor": "workload",
+    "coping_style": "analytical",
+    "last_summary": "No previous summary available.",
+    "chat_history": "(No previous history)",
+    "patients_json": '[{"alias":"J.","load":5}]',
+    "events_json": "[]",
+    "recent_logs_json": "<professional_personal_memory>\n\n</professional_personal_memory>",
+}
+
+
+class RenderChatSystemPromptTest(unittest.TestCase):
+    def test_matches_str_format_when_all_fields_present(self):
+        for language in ["en", "es-ES"]:
+            template = PROMPTS[_get_lang_key(language)]["chat_system"]
+            self.assertEqual(render_chat_system_prompt(language, _CHAT_FIELDS), template.format(**_CHAT_FIELDS))
+
+    def test_missing_fields_stay_as_placeholders(self):
+        fields = dict(_CHAT_FIELDS)
+        del fields["today_date"]
+        del fields["user_name"]
+        rendered = render_chat_system_prompt("en", fields)
+        self.assertIn("{today_date}", rendered)
+        self.assertIn("{user_name}", rendered)
+        self.assertIn("Therapist", rendered)
+
+    def test_no_fields_does_not_raise(self):
+        rendered = render_chat_system_prompt("es", {})
+        self.assertTrue(rendered.startswith(PROMPTS["es"]["chat_system_static"]))
+        self.assertIn("{chat_history}", rendered)
+
+    def test_values_are_not_reformatted(self):
+        fields = dict(_CHAT_FIELDS, chat_history="[USER]: use {braces} literally")
+        self.assertIn("use {braces} literally", render_chat_system_prompt("en", fields))
+
+
+if __name__ == "__main__":
+    unittest.main()
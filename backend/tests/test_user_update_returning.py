@@ -0,0 +1,47 @@
+import unittest
+import uuid
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.api.auth_routes import _update_user_returning
+from app.infrastructure.tables import UserModel
+
+
+class UpdateUserReturningTest(unittest.TestCase):
+    """The profile update routes must return the new values even when the
+    user row is already in the session's identity map (auth cache miss)."""
+
+    def setUp(self):
+        # SQLite stand-in for the users table: plain columns, no PG-only defaults
+        self.engine = create_engine("sqlite://")
+        columns = ", ".join(c.name for c in UserModel.__table__.columns if c.name != "id")
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql(f"CREATE TABLE users (id CHAR(32) PRIMARY KEY, {columns})")
+        self.user_id = uuid.uuid4()
+        with self.engine.begin() as conn:
+            conn.execute(UserModel.__table__.insert().values(
+                id=self.user_id, email="ana@example.com", hashed_password="x", language="en",
+                onboarding_completed=False, auth_provider="email", is_active=True,
+            ))
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def test_returns_new_values_for_an_already_loaded_user(self):
+        with Session(self.engine, expire_on_commit=False) as session:
+            loaded = session.get(UserModel, self.user_id)
+            self.assertEqual(loaded.language, "en")
+
+            updated = session.execute(
+                _update_user_returning(self.user_id, language="es", onboarding_completed=True)
+            ).scalar_one()
+            session.commit()
+
+            self.assertIs(updated, loaded)
+            self.assertEqual(updated.language, "es")
+            self.assertTrue(updated.onboarding_completed)
+
+
+if __name__ == "__main__":
+    unittest.main()